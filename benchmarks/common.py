@@ -0,0 +1,31 @@
+"""Database setup shared by the in-process benchmarks (scan_path, storage)."""
+import time
+from datetime import datetime
+from server_python import database, models
+from server_python.cache import roster_cache
+from server_python.migrations import run_migrations
+from server_python.storage import create_engines
+
+
+def setup_database(path, n_students, duration_minutes=120, min_attendance_percent=75.0, tuned=True):
+    """Fresh database at path with one event and BENCH000000.. students, bound as the app's engines."""
+    engine, read_engine = create_engines(f"sqlite:///{path}", tuned=tuned)
+    database.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    database.bind_engines(engine, read_engine)
+    roster_cache.invalidate_all()
+
+    db = database.SessionLocal()
+    event = models.Event(
+        title="Benchmark", event_date=datetime.now().strftime("%Y-%m-%d"),
+        start_time="", end_time="", duration_minutes=duration_minutes,
+        min_attendance_percent=min_attendance_percent, session_token=f"bench-{time.time()}"
+    )
+    db.add(event)
+    db.bulk_insert_mappings(models.Student, [
+        {"roll_no": f"BENCH{i:06d}", "name": f"Student {i}"} for i in range(n_students)
+    ])
+    db.commit()
+    event_id = event.id
+    db.close()
+    return engine, read_engine, event_id
@@ -0,0 +1,255 @@
+"""Offline decode benchmark: every decode engine and cascade order over a QR corpus.
+
+Generates a reproducible synthetic corpus of roll-number QR codes with
+zxingcpp (clean, blur, perspective, low light, small and multi-code frames,
+plus empty frames to catch false positives), optionally extended with a
+directory of images or a video file, and times each cascade on every frame.
+No camera or server needed, so it runs in CI.
+
+    python -m benchmarks.decode --per-variant 25 --json decode_bench.json
+    python -m benchmarks.decode --images recordings/ --video gate1.mp4 --video-label HU22CSEN0100593
+
+Recorded images are labelled by an optional labels.csv in their directory
+(filename,text[;text...]); unlabelled frames only count toward speed and
+detection rate.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+import cv2
+import numpy as np
+import zxingcpp
+from qr_decode import DecodeCascade, ID_CARD_CASCADE, SCANNER_CASCADE, VISHWAKARMA_CASCADE, parse_spec
+from . import percentile
+
+FRAME_SIZE = (1280, 720)
+VARIANTS = ["clean", "blur", "perspective", "low_light", "small", "multi", "empty"]
+
+
+# --- Corpus ---
+
+def qr_image(text, size):
+    barcode = zxingcpp.create_barcode(text, zxingcpp.BarcodeFormat.QRCode)
+    image = np.array(zxingcpp.write_barcode_to_image(barcode, scale=4))
+    return cv2.cvtColor(cv2.resize(image, (size, size), interpolation=cv2.INTER_NEAREST), cv2.COLOR_GRAY2BGR)
+
+
+def background(rng):
+    width, height = FRAME_SIZE
+    noise = rng.integers(60, 200, (height // 8, width // 8, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(cv2.resize(noise, FRAME_SIZE, interpolation=cv2.INTER_LINEAR), (15, 15), 0)
+
+
+def place(frame, code, rng, occupied):
+    """Paste a code at a random spot that does not overlap earlier ones."""
+    height, width = frame.shape[:2]
+    size = code.shape[0]
+    for _ in range(50):
+        x, y = int(rng.integers(0, width - size)), int(rng.integers(0, height - size))
+        if all(x + size < ox or ox + osz < x or y + size < oy or oy + osz < y for ox, oy, osz in occupied):
+            frame[y:y + size, x:x + size] = code
+            occupied.append((x, y, size))
+            return True
+    return False
+
+
+def warp_code(frame, code, rng):
+    """Paste a code through a random perspective transform (a tilted card)."""
+    height, width = frame.shape[:2]
+    size = code.shape[0]
+    x, y = int(rng.integers(100, width - size - 100)), int(rng.integers(100, height - size - 100))
+    src = np.float32([[0, 0], [size, 0], [size, size], [0, size]])
+    jitter = rng.uniform(-0.3, 0.3, (4, 2)) * size
+    dst = np.float32([[x, y], [x + size, y], [x + size, y + size], [x, y + size]]) + jitter.astype(np.float32)
+    matrix = cv2.getPerspectiveTransform(src, dst)
+    warped = cv2.warpPerspective(code, matrix, (width, height))
+    mask = cv2.warpPerspective(np.full(code.shape[:2], 255, np.uint8), matrix, (width, height))
+    frame[mask > 0] = warped[mask > 0]
+
+
+def make_sample(variant, index, rng):
+    frame = background(rng)
+    roll_nos = [f"HU22CSEN01{index:05d}{suffix}" for suffix in ("", "A", "B")]
+    expected = []
+    occupied = []
+
+    if variant == "multi":
+        for roll_no in roll_nos:
+            if place(frame, qr_image(roll_no, int(rng.integers(160, 240))), rng, occupied):
+                expected.append(roll_no)
+    elif variant == "perspective":
+        warp_code(frame, qr_image(roll_nos[0], int(rng.integers(220, 320))), rng)
+        expected.append(roll_nos[0])
+    elif variant != "empty":
+        size = int(rng.integers(36, 80)) if variant == "small" else int(rng.integers(200, 320))
+        place(frame, qr_image(roll_nos[0], size), rng, occupied)
+        expected.append(roll_nos[0])
+
+    if variant == "blur":
+        k = int(rng.choice([9, 13, 17, 21]))
+        kernel = np.zeros((k, k), np.float32)
+        kernel[k // 2, :] = 1.0 / k  # horizontal motion blur
+        frame = cv2.GaussianBlur(cv2.filter2D(frame, -1, kernel), (3, 3), 0)
+    elif variant == "low_light":
+        dark = frame.astype(np.float32) * rng.uniform(0.05, 0.15)
+        frame = np.clip(dark + rng.normal(0, 6, frame.shape), 0, 255).astype(np.uint8)
+
+    return {"name": f"{variant}-{index:03d}", "variant": variant, "frame": frame, "expected": expected}
+
+
+def synthetic_corpus(per_variant, seed):
+    rng = np.random.default_rng(seed)
+    return [make_sample(variant, i, rng) for variant in VARIANTS for i in range(per_variant)]
+
+
+def image_corpus(directory):
+    labels = {}
+    labels_path = os.path.join(directory, "labels.csv")
+    if os.path.exists(labels_path):
+        with open(labels_path, newline="") as f:
+            for row in csv.reader(f):
+                if len(row) >= 2:
+                    labels[row[0]] = [t for t in row[1].split(";") if t]
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        frame = cv2.imread(os.path.join(directory, name))
+        if frame is not None:
+            samples.append({"name": name, "variant": "images", "frame": frame, "expected": labels.get(name)})
+    return samples
+
+
+def video_corpus(path, label=None, max_frames=600):
+    samples = []
+    cap = cv2.VideoCapture(path)
+    while len(samples) < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        samples.append({
+            "name": f"{os.path.basename(path)}#{len(samples)}", "variant": "video",
+            "frame": frame, "expected": [label] if label else None,
+        })
+    cap.release()
+    return samples
+
+
+# --- Cascades (qr_decode specs) ---
+
+DEFAULT_CASCADES = [
+    "zxing", "zxing:lowres", "zxing:clahe", "pyzbar", "pyzbar:clahe", "pyzbar:threshold", "opencv",
+    SCANNER_CASCADE,                      # scanner.py
+    "zxing>pyzbar:clahe",                 # vishwakarma_v1_decode before ROI tracking
+    VISHWAKARMA_CASCADE,                  # vishwakarma_v1_decode (no tracked region)
+    ID_CARD_CASCADE,                      # decode_user_id.py
+    "pyzbar:clahe>zxing",
+    "zxing>zxing:clahe>pyzbar:clahe",
+]
+
+
+def bench_cascade(spec, corpus, repeat, adaptive=False):
+    cascade = DecodeCascade.from_spec(spec, adaptive=adaptive)
+    latencies = []
+    labelled = found_frames = decoded_frames = 0
+    codes_expected = codes_found = misreads = 0
+    per_variant = {}
+
+    for sample in corpus:
+        frame, expected = sample["frame"], sample["expected"]
+        texts = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            texts = [res["data"] for res in cascade.decode(frame).results]
+            latencies.append(time.perf_counter() - start)
+        decoded_frames += bool(texts)
+
+        if expected is None:
+            continue
+        labelled += 1
+        hits = set(texts) & set(expected)
+        ok = set(expected) <= hits if expected else not texts
+        found_frames += ok
+        codes_expected += len(expected)
+        codes_found += len(hits)
+        misreads += len([t for t in texts if t not in expected])
+        bucket = per_variant.setdefault(sample["variant"], [0, 0])
+        bucket[0] += ok
+        bucket[1] += 1
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "cascade": spec,
+        "frames": len(corpus),
+        "fps": round(len(latencies) / total, 1) if total else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "success_rate": round(found_frames / labelled, 4) if labelled else None,
+        "code_recall": round(codes_found / codes_expected, 4) if codes_expected else None,
+        "misreads": misreads,
+        "detection_rate": round(decoded_frames / len(corpus), 4) if corpus else 0.0,
+        "per_variant": {v: round(ok / n, 4) for v, (ok, n) in per_variant.items()},
+        "stages": cascade.stats()["stages"],
+        "final_order": cascade.order(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark QR decode engines and cascades offline")
+    parser.add_argument("--per-variant", type=int, default=20, help="Synthetic frames per variant (0 to skip)")
+    parser.add_argument("--seed", type=int, default=1, help="Synthetic corpus seed")
+    parser.add_argument("--images", type=str, help="Directory of recorded frames (optional labels.csv)")
+    parser.add_argument("--video", type=str, help="Video file to add to the corpus")
+    parser.add_argument("--video-label", type=str, help="Code text every video frame shows")
+    parser.add_argument("--cascade", action="append", help="Cascade to run, e.g. zxing:lowres>zxing (repeatable)")
+    parser.add_argument("--adaptive", action="store_true", help="Let cascades reorder themselves while running")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per frame")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV threads (1 = per-core numbers)")
+    parser.add_argument("--json", type=str, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(args.threads)
+
+    corpus = synthetic_corpus(args.per_variant, args.seed) if args.per_variant else []
+    if args.images:
+        corpus += image_corpus(args.images)
+    if args.video:
+        corpus += video_corpus(args.video, args.video_label)
+    if not corpus:
+        parser.error("empty corpus")
+
+    skipped = []
+    results = []
+    for spec in args.cascade or DEFAULT_CASCADES:
+        try:
+            available = len(DecodeCascade.from_spec(spec).stages) == len(parse_spec(spec))
+        except ValueError as e:
+            if "at least one" not in str(e):
+                parser.error(str(e))
+            available = False
+        if not available:
+            skipped.append(spec)
+            continue
+        results.append(bench_cascade(spec, corpus, args.repeat, args.adaptive))
+
+    print(f"{'cascade':<34}{'fps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'success':>9}{'misreads':>9}")
+    for r in results:
+        success = "-" if r["success_rate"] is None else f"{r['success_rate']:.1%}"
+        print(f"{r['cascade']:<34}{r['fps']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{success:>9}{r['misreads']:>9}")
+    if skipped:
+        print(f"Skipped (backend not installed): {', '.join(skipped)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "corpus": {"frames": len(corpus), "per_variant": args.per_variant, "seed": args.seed,
+                           "images": args.images, "video": args.video},
+                "results": results,
+                "skipped": skipped,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
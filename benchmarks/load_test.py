@@ -0,0 +1,380 @@
+"""End-to-end load test: a fleet of kiosks and dashboards against a live server.
+
+Starts `uvicorn server_python.main:app` in a temporary directory (so it gets
+its own attendance.db), seeds students and events, then runs K kiosk threads
+with a realistic scan mix - check-ins, check-outs, duplicate re-scans within
+the cooldown and unknown codes - while dashboard threads poll event stats
+(with ETags, like the admin UI) and the attendance list.
+
+    python -m benchmarks.load_test --kiosks 16 --students 5000 --duration 30
+    python -m benchmarks.load_test --kiosks 32 --interval 0 --baseline load_baseline.json
+
+Reports throughput, p50/p95/p99 per endpoint and errors (timeouts, dropped
+connections, 5xx, "database is locked" in the server log). With --baseline
+the first run saves the results; later runs fail (exit 1) when the scan
+path got slower or fewer scans went through than the baseline allows.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import requests
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from server_python import database, models
+from server_python.migrations import run_migrations
+from . import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "checkin=45,checkout=30,duplicate=15,unknown=10"
+EXPECTED_ACTION = {
+    "checkin": "CHECK_IN", "checkout": "CHECK_OUT", "duplicate": "DUPLICATE_BLOCKED", "unknown": None,
+}
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in EXPECTED_ACTION:
+            raise ValueError(f"Unknown scan kind {kind!r} (expected {', '.join(EXPECTED_ACTION)})")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+# --- Server ---
+
+def seed_database(path, n_students, n_events):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = sessionmaker(bind=engine)()
+    events = [
+        models.Event(
+            title=f"Load test {i + 1}", event_date=datetime.now().strftime("%Y-%m-%d"),
+            start_time="", end_time="", duration_minutes=120,
+            min_attendance_percent=75.0, session_token=f"load-{i}-{time.time()}"
+        )
+        for i in range(n_events)
+    ]
+    db.add_all(events)
+    db.bulk_insert_mappings(models.Student, [
+        {"roll_no": f"LOAD{i:06d}", "name": f"Student {i}"} for i in range(n_students)
+    ])
+    db.commit()
+    event_ids = [event.id for event in events]
+    db.close()
+    engine.dispose()
+    return event_ids
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, port, workers, write_behind):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    if write_behind:
+        env["ATTENDANCE_WRITE_BEHIND"] = "1"
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server_python.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--no-access-log"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}, see {log.name}")
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy within 30s")
+
+
+# --- Clients ---
+
+class Recorder:
+    """Latencies, status codes and errors per endpoint, shared by all client threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+        self.unexpected = {}
+
+    def call(self, endpoint, session, method, url, timeout, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.Timeout:
+            self._error(endpoint, "timeout")
+            return None
+        except requests.RequestException:
+            self._error(endpoint, "connection")
+            return None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed)
+            statuses = self.statuses.setdefault(endpoint, {})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code >= 500:
+            self._error(endpoint, "db_locked" if "locked" in response.text else "server_error")
+        return response
+
+    def _error(self, endpoint, kind):
+        with self._lock:
+            errors = self.errors.setdefault(endpoint, {})
+            errors[kind] = errors.get(kind, 0) + 1
+
+    def mismatch(self, kind, action):
+        with self._lock:
+            key = f"{kind}->{action}"
+            self.unexpected[key] = self.unexpected.get(key, 0) + 1
+
+
+def kiosk(index, base_url, event_id, roll_nos, mix, args, recorder, stop):
+    """One gate: a closed loop of scans with think time, over its own share of the roster."""
+    rng = random.Random(index)
+    session = requests.Session()
+    waiting = list(roll_nos)       # not checked in yet
+    rng.shuffle(waiting)
+    inside = []                    # checked in, not out
+    recent_out = []                # checked out within the cooldown window
+    kinds, weights = list(mix), list(mix.values())
+
+    while not stop.is_set():
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "checkout" and not inside:
+            kind = "checkin"
+        if kind == "duplicate" and not recent_out:
+            kind = "checkin" if waiting else "unknown"
+        if kind == "checkin" and not waiting:
+            kind = "checkout" if inside else "unknown"
+
+        payload = {"event_id": event_id}
+        if kind == "checkin":
+            roll_no = waiting.pop()
+            # Backdated past the event's required time, so the later check-out is a real one
+            payload["scanned_at"] = (datetime.now() - timedelta(hours=2)).isoformat()
+        elif kind == "checkout":
+            roll_no = inside.pop(rng.randrange(len(inside)))
+        elif kind == "duplicate":
+            roll_no = recent_out[-1][0]
+        else:
+            roll_no = f"UNKNOWN{rng.randrange(10 ** 6):06d}"
+        payload["roll_no"] = roll_no
+
+        response = recorder.call("scan", session, "POST", f"{base_url}/api/scan/", args.timeout, json=payload)
+        if response is not None:
+            action = response.json().get("action") if response.status_code == 200 else response.status_code
+            expected = EXPECTED_ACTION[kind]
+            if kind == "unknown":
+                if response.status_code != 404:
+                    recorder.mismatch(kind, action)
+            elif action != expected:
+                recorder.mismatch(kind, action)
+            elif kind == "checkin":
+                inside.append(roll_no)
+            elif kind == "checkout":
+                recent_out.append((roll_no, time.time()))
+
+        now = time.time()
+        while recent_out and now - recent_out[0][1] > 8:  # server cooldown is 10s
+            recent_out.pop(0)
+        if args.interval:
+            stop.wait(rng.uniform(0.5, 1.5) * args.interval)
+    session.close()
+
+
+def dashboard(index, base_url, event_ids, args, recorder, stop):
+    """Admin UI: event stats with If-None-Match, plus the attendance table every few polls."""
+    session = requests.Session()
+    etags = {}
+    polls = 0
+    while not stop.is_set():
+        event_id = event_ids[(index + polls) % len(event_ids)]
+        headers = {"If-None-Match": etags[event_id]} if event_id in etags else {}
+        response = recorder.call(
+            "stats", session, "GET", f"{base_url}/api/events/{event_id}/stats", args.timeout, headers=headers
+        )
+        if response is not None and response.headers.get("ETag"):
+            etags[event_id] = response.headers["ETag"]
+        if polls % 5 == 0:
+            recorder.call("attendance", session, "GET", f"{base_url}/api/attendance/event/{event_id}", args.timeout)
+        polls += 1
+        stop.wait(args.poll)
+    session.close()
+
+
+# --- Run ---
+
+def run(args):
+    mix = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as workdir:
+        event_ids = seed_database(os.path.join(workdir, "attendance.db"), args.students, args.events)
+        process, base_url = start_server(workdir, free_port(), args.server_workers, args.write_behind)
+        try:
+            recorder = Recorder()
+            stop = threading.Event()
+            threads = []
+            for k in range(args.kiosks):
+                event_id = event_ids[k % len(event_ids)]
+                # Kiosks of the same event split its roster between them
+                same_event = [i for i in range(args.kiosks) if event_ids[i % len(event_ids)] == event_id]
+                share = [f"LOAD{i:06d}" for i in range(same_event.index(k), args.students, len(same_event))]
+                threads.append(threading.Thread(
+                    target=kiosk, args=(k, base_url, event_id, share, mix, args, recorder, stop), daemon=True
+                ))
+            for d in range(args.dashboards):
+                threads.append(threading.Thread(
+                    target=dashboard, args=(d, base_url, event_ids, args, recorder, stop), daemon=True
+                ))
+
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            time.sleep(args.duration)
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=args.timeout + 1)
+            wall = time.perf_counter() - start
+
+            try:
+                server = requests.get(f"{base_url}/api/health/full", timeout=5).json().get("metrics")
+            except (requests.RequestException, ValueError):
+                server = None
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        with open(os.path.join(workdir, "server.log")) as f:
+            log = f.read()
+
+    endpoints = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "per_sec": round(len(latencies) / wall, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "statuses": {str(k): v for k, v in sorted(recorder.statuses[endpoint].items())},
+            "errors": recorder.errors.get(endpoint, {}),
+        }
+    return {
+        "config": {
+            "kiosks": args.kiosks, "dashboards": args.dashboards, "students": args.students,
+            "events": args.events, "duration": args.duration, "interval": args.interval,
+            "mix": args.mix, "server_workers": args.server_workers, "write_behind": args.write_behind,
+        },
+        "endpoints": endpoints,
+        "unexpected_actions": recorder.unexpected,
+        "server_log": {
+            "database_locked": log.count("database is locked"),
+            "tracebacks": log.count("Traceback (most recent call last)"),
+        },
+        "server_metrics": server,
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Regressions of the scan path against a saved run (empty list = pass)."""
+    failures = []
+    if baseline["config"] != result["config"]:
+        print("⚠️ Baseline was recorded with a different configuration; comparing anyway")
+    now, then = result["endpoints"].get("scan"), baseline["endpoints"].get("scan")
+    if not now:
+        return ["no scan completed"]
+    if then:
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            # Relative tolerance plus 2ms of slack, so sub-millisecond noise never fails a run
+            limit = then[key] * (1 + tolerance) + 2.0
+            if now[key] > limit:
+                failures.append(f"scan {key} {now[key]} > {limit:.2f} (baseline {then[key]})")
+        floor = then["per_sec"] * (1 - tolerance)
+        if now["per_sec"] < floor:
+            failures.append(f"scan throughput {now['per_sec']}/s < {floor:.1f}/s (baseline {then['per_sec']}/s)")
+    errors = sum(sum(e["errors"].values()) for e in result["endpoints"].values())
+    baseline_errors = sum(sum(e["errors"].values()) for e in baseline["endpoints"].values())
+    if errors > baseline_errors:
+        failures.append(f"{errors} request errors (baseline {baseline_errors})")
+    if result["server_log"]["database_locked"] > baseline["server_log"]["database_locked"]:
+        failures.append(f"{result['server_log']['database_locked']} 'database is locked' errors in the server log")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the attendance API with simulated kiosks and dashboards")
+    parser.add_argument("--kiosks", type=int, default=8, help="Concurrent scanning kiosks")
+    parser.add_argument("--dashboards", type=int, default=2, help="Concurrent admin dashboards")
+    parser.add_argument("--students", type=int, default=2000, help="Seeded students")
+    parser.add_argument("--events", type=int, default=2, help="Seeded events (kiosks are spread over them)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--interval", type=float, default=0.25, help="Mean seconds between scans per kiosk (0 = flat out)")
+    parser.add_argument("--poll", type=float, default=2.0, help="Seconds between dashboard polls")
+    parser.add_argument("--mix", type=str, default=DEFAULT_MIX, help="Scan mix weights")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Client request timeout")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--write-behind", action="store_true", help="Run the server with ATTENDANCE_WRITE_BEHIND=1")
+    parser.add_argument("--baseline", type=str, help="Baseline JSON: saved if missing, otherwise compared against")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression vs the baseline")
+    parser.add_argument("--json", type=str, help="Write results as JSON to this path")
+    args = parser.parse_args()
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    result = run(args)
+
+    print(f"{'endpoint':<12}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  errors")
+    for endpoint, r in result["endpoints"].items():
+        errors = ", ".join(f"{k} {v}" for k, v in r["errors"].items()) or "-"
+        print(f"{endpoint:<12}{r['requests']:>10}{r['per_sec']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}  {errors}")
+    if result["unexpected_actions"]:
+        print(f"Unexpected scan outcomes: {result['unexpected_actions']}")
+    log = result["server_log"]
+    print(f"Server log: {log['database_locked']} 'database is locked', {log['tracebacks']} tracebacks")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        if args.update_baseline or not os.path.exists(args.baseline):
+            with open(args.baseline, "w") as f:
+                json.dump(result, f, indent=2)
+            print(f"📌 Saved baseline to {args.baseline}")
+            return
+        with open(args.baseline) as f:
+            failures = compare(result, json.load(f), args.tolerance)
+        if failures:
+            for failure in failures:
+                print(f"❌ {failure}")
+            sys.exit(1)
+        print(f"✅ Within {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Scan path benchmark: synchronous commit per scan vs the write-behind journal.
+
+Runs a check-in pass and a check-out pass for every student against a fresh
+temporary SQLite database per mode, awaiting scan_qr the way a request
+would (through the group-committing writer) with --workers scans in flight.
+
+    python -m benchmarks.scan_path --students 2000 --workers 8 --json bench_output.txt
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from starlette.requests import Request
+from server_python import audit, database, models, journal
+from server_python.routes.scan import scan_qr
+from server_python.schemas import ScanRequest
+from . import percentile
+from .common import setup_database
+
+# 100% attendance required: a check-out exactly EVENT_MINUTES after check-in is PRESENT
+EVENT_MINUTES = 60
+REQUIRED_MINUTES = float(EVENT_MINUTES)
+
+# What scan_qr reads from the HTTP request: the kiosk id for the audit log
+KIOSK = Request({"type": "http", "headers": [(b"x-kiosk-id", b"bench")], "client": None})
+
+
+def run_pass(scans, workers):
+    async def drive():
+        in_flight = asyncio.Semaphore(workers)
+
+        async def one(request):
+            async with in_flight:
+                start = time.perf_counter()
+                await scan_qr(request, KIOSK)
+                return time.perf_counter() - start
+
+        return await asyncio.gather(*(one(request) for request in scans))
+
+    start = time.perf_counter()
+    latencies = list(asyncio.run(drive()))
+    return latencies, time.perf_counter() - start
+
+
+def run_mode(mode, n_students, workers, workdir):
+    engine, read_engine, event_id = setup_database(
+        os.path.join(workdir, f"{mode}.db"), n_students, EVENT_MINUTES, min_attendance_percent=100.0
+    )
+    if mode == "write_behind":
+        journal.active = journal.AttendanceJournal(os.path.join(workdir, f"{mode}.journal")).start()
+
+    # Check-ins backdated two hours; check-outs exactly REQUIRED_MINUTES later, so
+    # both modes must agree on the PRESENT/ABSENT boundary (see main)
+    check_in_at = datetime.now() - timedelta(hours=2)
+    check_out_at = check_in_at + timedelta(minutes=REQUIRED_MINUTES)
+    check_ins = [ScanRequest(roll_no=f"BENCH{i:06d}", event_id=event_id, scanned_at=check_in_at) for i in range(n_students)]
+    check_outs = [ScanRequest(roll_no=f"BENCH{i:06d}", event_id=event_id, scanned_at=check_out_at) for i in range(n_students)]
+
+    latencies, wall = [], 0.0
+    for scans in (check_ins, check_outs):
+        pass_latencies, pass_wall = run_pass(scans, workers)
+        latencies += pass_latencies
+        wall += pass_wall
+
+    drain = 0.0
+    if journal.active is not None:
+        start = time.perf_counter()
+        journal.stop()
+        drain = time.perf_counter() - start
+    audit.log.stop()
+
+    db = database.SessionLocal()
+    written = db.query(models.AttendanceLog).filter(
+        models.AttendanceLog.event_id == event_id,
+        models.AttendanceLog.check_out_time.isnot(None)
+    ).count()
+    present = db.query(models.AttendanceLog).filter(
+        models.AttendanceLog.event_id == event_id,
+        models.AttendanceLog.status == "PRESENT",
+        models.AttendanceLog.duration_minutes == REQUIRED_MINUTES
+    ).count()
+    db.close()
+    engine.dispose()
+    read_engine.dispose()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "scans": len(latencies),
+        "scans_per_sec": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "final_drain_ms": round(drain * 1000, 1),
+        "checked_out_rows": written,
+        "present_at_boundary": present,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scan write path")
+    parser.add_argument("--students", type=int, default=2000, help="Students (each scans in and out)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent scan requests")
+    parser.add_argument("--json", type=str, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run_mode(mode, args.students, args.workers, workdir) for mode in ("sync", "write_behind")]
+
+    print(f"{'mode':<14}{'scans/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'drain ms':>10}")
+    for r in results:
+        print(f"{r['mode']:<14}{r['scans_per_sec']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['final_drain_ms']:>10}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    # Both write paths must mark every boundary stay PRESENT with exactly the required duration
+    mismatched = [r["mode"] for r in results if r["present_at_boundary"] != args.students]
+    if mismatched:
+        print(f"❌ PRESENT at exactly {REQUIRED_MINUTES:g} min: " + ", ".join(
+            f"{r['mode']} {r['present_at_boundary']}/{args.students}" for r in results))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Storage profile benchmark: mixed scan writes and dashboard reads per SQLite setup.
+
+For each profile a fresh temporary database is seeded and hammered for a
+fixed time by writer threads (scan check-ins and check-outs, one commit
+each, like the sync routes) and reader threads (event stats and the full
+attendance list, like polling dashboards):
+
+  default - one engine, rollback journal, default pragmas (the old setup)
+  tuned   - storage.create_engines: WAL, pragma profile, single writer
+            connection plus a read-only reader pool
+
+    python -m benchmarks.storage --students 3000 --writers 8 --readers 4 --duration 10
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from server_python import database
+from server_python.routes.attendance import attendance_rows
+from server_python.routes.events import read_event_counters
+from server_python.routes.scan import process_scan
+from server_python.schemas import ScanRequest
+from . import percentile
+from .common import setup_database
+
+PROFILES = ["default", "tuned"]
+
+
+class Samples:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def add(self, kind, seconds):
+        with self._lock:
+            self.latencies.setdefault(kind, []).append(seconds)
+
+    def error(self, kind, e):
+        key = "locked" if "locked" in str(e) else e.__class__.__name__
+        with self._lock:
+            errors = self.errors.setdefault(kind, {})
+            errors[key] = errors.get(key, 0) + 1
+
+
+def writer(index, n_writers, event_id, n_students, samples, stop):
+    """Check this writer's share of the students in (backdated), then out again."""
+    check_in_at = datetime.now() - timedelta(hours=2)
+    mine = [f"BENCH{i:06d}" for i in range(index, n_students, n_writers)]
+    passes = [(roll_no, check_in_at) for roll_no in mine] + [(roll_no, None) for roll_no in mine]
+    i = 0
+    while not stop.is_set() and i < len(passes):
+        roll_no, scanned_at = passes[i]
+        i += 1
+        db = database.SessionLocal()
+        start = time.perf_counter()
+        try:
+            process_scan(db, ScanRequest(roll_no=roll_no, event_id=event_id), scanned_at or datetime.now())
+            db.commit()
+            samples.add("scan", time.perf_counter() - start)
+        except Exception as e:
+            db.rollback()
+            samples.error("scan", e)
+        finally:
+            db.close()
+
+
+def reader(index, event_id, samples, stop):
+    polls = 0
+    while not stop.is_set():
+        kind, fn = ("attendance", attendance_rows) if polls % 5 == 4 else ("stats", read_event_counters)
+        db = database.ReadSessionLocal()
+        start = time.perf_counter()
+        try:
+            fn(db, event_id)
+            samples.add(kind, time.perf_counter() - start)
+        except Exception as e:
+            samples.error(kind, e)
+        finally:
+            db.close()
+        polls += 1
+
+
+def run_profile(profile, args, workdir):
+    engine, read_engine, event_id = setup_database(
+        os.path.join(workdir, f"{profile}.db"), args.students, tuned=profile == "tuned"
+    )
+    samples = Samples()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=writer, args=(i, args.writers, event_id, args.students, samples, stop))
+        for i in range(args.writers)
+    ] + [
+        threading.Thread(target=reader, args=(i, event_id, samples, stop)) for i in range(args.readers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    # Writers stop by themselves once every student is checked in and out
+    for thread in threads[:args.writers]:
+        thread.join(timeout=max(0.0, args.duration - (time.perf_counter() - start)))
+    stop.set()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    engine.dispose()
+    read_engine.dispose()
+
+    result = {"profile": profile, "seconds": round(wall, 2), "errors": samples.errors}
+    for kind in ("scan", "stats", "attendance"):
+        latencies = sorted(samples.latencies.get(kind, []))
+        result[kind] = {
+            "ops": len(latencies),
+            "per_sec": round(len(latencies) / wall, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite storage profiles under mixed load")
+    parser.add_argument("--students", type=int, default=3000, help="Students (each scans in and out)")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent scan threads")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent dashboard threads")
+    parser.add_argument("--duration", type=float, default=10.0, help="Maximum seconds per profile")
+    parser.add_argument("--profile", action="append", choices=PROFILES, help="Profile to run (repeatable)")
+    parser.add_argument("--json", type=str, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run_profile(profile, args, workdir) for profile in args.profile or PROFILES]
+
+    print(f"{'profile':<10}{'op':<12}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        for kind in ("scan", "stats", "attendance"):
+            k = r[kind]
+            print(f"{r['profile']:<10}{kind:<12}{k['per_sec']:>10}{k['p50_ms']:>10}{k['p95_ms']:>10}{k['p99_ms']:>10}")
+        if r["errors"]:
+            print(f"{'':<10}errors: {r['errors']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const API_BASE = `http://${window.location.hostname}:8000/api`;
+export const API_BASE = `http://${window.location.hostname}:8000/api`;
 
 const api = axios.create({
   baseURL: API_BASE,
@@ -28,4 +28,28 @@ api.interceptors.response.use(
   }
 );
 
+// Server-sent attendance deltas for one event (see GET /events/:id/stream).
+// EventSource reconnects by itself and resumes from the last delta id.
+export function subscribeEvent(eventId, handlers) {
+  const source = new EventSource(`${API_BASE}/events/${eventId}/stream`);
+  Object.entries(handlers).forEach(([type, handler]) => {
+    source.addEventListener(type, e => handler(JSON.parse(e.data)));
+  });
+  return () => source.close();
+}
+
+// Sent with scans as X-Kiosk-Id so the server's audit log can tell scanner
+// devices apart. Set it per device by opening the scanner with ?kiosk=<id>;
+// otherwise a random id is generated once and kept in localStorage.
+export function kioskId() {
+  const fromUrl = new URLSearchParams(window.location.search).get('kiosk');
+  if (fromUrl) localStorage.setItem('kioskId', fromUrl);
+  let id = localStorage.getItem('kioskId');
+  if (!id) {
+    id = `web-${Math.random().toString(36).slice(2, 8)}`;
+    localStorage.setItem('kioskId', id);
+  }
+  return id;
+}
+
 export default api;
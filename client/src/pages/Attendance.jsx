@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import api from '../api';
+import api, { subscribeEvent } from '../api';
 import Layout from '../components/Layout';
 
 export default function Attendance() {
@@ -14,10 +14,34 @@ export default function Attendance() {
 
   useEffect(() => {
     loadData();
-    const interval = setInterval(loadData, 5000); // Auto-refresh every 5s
-    return () => clearInterval(interval);
+    // Apply pushed deltas; only a reset/finalize needs a full reload
+    return subscribeEvent(eventId, {
+      scan: applyScan,
+      stats: data => setStats(prev => ({ ...prev, ...data })),
+      finalize: loadData,
+      reset: loadData
+    });
   }, [eventId]);
 
+  const applyScan = (scan) => {
+    setAttendance(prev => {
+      const row = {
+        roll_no: scan.roll_no,
+        student_name: scan.student_name,
+        check_in_time: scan.check_in_time,
+        check_out_time: scan.check_out_time,
+        duration_minutes: scan.duration_minutes,
+        status: scan.status
+      };
+      const rows = prev || [];
+      const index = rows.findIndex(r => r.roll_no === scan.roll_no);
+      if (index === -1) return [...rows, row];
+      const next = [...rows];
+      next[index] = { ...rows[index], ...row };
+      return next;
+    });
+  };
+
   const loadData = async () => {
     try {
       const [attendanceRes, statsRes] = await Promise.all([
@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import api from '../api';
+import api, { kioskId, subscribeEvent } from '../api';
 import QrScanner from '../components/QrScanner';
 import Layout from '../components/Layout';
 
@@ -11,6 +11,7 @@ export default function Scanner() {
   const [lastResult, setLastResult] = useState(null);
   const [recentScans, setRecentScans] = useState([]);
   const [stats, setStats] = useState(null);
+  const [kiosk] = useState(kioskId);
   const [processingUI, setProcessingUI] = useState(false);
   const processingRef = useRef(false);
   const lastScanTime = useRef(0);
@@ -19,8 +20,11 @@ export default function Scanner() {
   useEffect(() => {
     loadEvent();
     loadStats();
-    const interval = setInterval(loadStats, 5000);
-    return () => clearInterval(interval);
+    // Live counters pushed by the server instead of polling
+    return subscribeEvent(eventId, {
+      stats: data => setStats(prev => ({ ...prev, ...data })),
+      reset: loadStats
+    });
   }, [eventId]);
 
   const loadEvent = async () => {
@@ -58,11 +62,10 @@ export default function Scanner() {
       const res = await api.post('/scan', {
         roll_no: decodedText.trim(),
         event_id: Number(eventId)
-      });
+      }, { headers: { 'X-Kiosk-Id': kiosk } });
 
       setLastResult({ success: true, data: res.data });
       setRecentScans(prev => [res.data, ...prev].slice(0, 20));
-      loadStats();
     } catch (err) {
       const data = err.response?.data || { error: 'Scan failed' };
       setLastResult({
@@ -78,7 +81,7 @@ export default function Scanner() {
       processingRef.current = false;
       setProcessingUI(false);
     }
-  }, [eventId]);
+  }, [eventId, kiosk]);
 
   const getResultClass = () => {
     if (!lastResult) return '';
@@ -130,7 +133,7 @@ export default function Scanner() {
         <div className="page-header">
           <div>
             <h1>📷 QR Scanner</h1>
-            <p className="subtitle">{event.title} — {event.event_date}</p>
+            <p className="subtitle">{event.title} — {event.event_date} · Kiosk {kiosk}</p>
           </div>
         </div>
 
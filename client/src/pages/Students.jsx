@@ -5,6 +5,8 @@ import Layout from '../components/Layout';
 
 export default function Students() {
   const [students, setStudents] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
   const [showForm, setShowForm] = useState(false);
@@ -13,35 +15,25 @@ export default function Students() {
   const [bulkText, setBulkText] = useState('');
   const [error, setError] = useState('');
 
-  useEffect(() => {
-    loadStudents();
-  }, []);
-
-  const loadStudents = async () => {
+  // Server-side search with keyset pagination: pass the cursor to append the next page
+  const loadStudents = async (cursor = null) => {
     try {
-      const res = await api.get('/students');
-      setStudents(res.data);
+      const params = new URLSearchParams();
+      if (search) params.set('search', search);
+      if (cursor) params.set('cursor', cursor);
+      const res = await api.get(`/students?${params}`);
+      setStudents(prev => cursor ? [...prev, ...res.data.items] : res.data.items);
+      setTotal(res.data.total);
+      setNextCursor(res.data.next_cursor);
     } catch (err) {
-      console.error('Failed to load students');
+      console.error(search ? 'Search failed' : 'Failed to load students');
     } finally {
       setLoading(false);
     }
   };
 
-  const searchStudents = async () => {
-    try {
-      const res = await api.get(`/students?search=${encodeURIComponent(search)}`);
-      setStudents(res.data);
-    } catch (err) {
-      console.error('Search failed');
-    }
-  };
-
   useEffect(() => {
-    const timer = setTimeout(() => {
-      if (search) searchStudents();
-      else loadStudents();
-    }, 300);
+    const timer = setTimeout(() => loadStudents(), 300);
     return () => clearTimeout(timer);
   }, [search]);
 
@@ -91,6 +83,7 @@ export default function Students() {
     try {
       await api.delete(`/students/${rollNo}`);
       setStudents(students.filter(s => s.roll_no !== rollNo));
+      setTotal(t => t - 1);
     } catch (err) {
       alert('Failed to delete student');
     }
@@ -102,7 +95,7 @@ export default function Students() {
         <div className="page-header">
           <div>
             <h1>👥 Student Registry</h1>
-            <p className="subtitle">{students.length} students registered</p>
+            <p className="subtitle">{total} students {search ? 'found' : 'registered'}</p>
           </div>
           <div className="header-actions">
             <button onClick={() => { setShowForm(!showForm); setShowBulk(false); }} className="btn btn-primary">
@@ -194,6 +187,11 @@ export default function Students() {
                 )}
               </tbody>
             </table>
+            {nextCursor && (
+              <button onClick={() => loadStudents(nextCursor)} className="btn btn-secondary btn-full" style={{ marginTop: '1rem' }}>
+                Load more ({students.length} of {total})
+              </button>
+            )}
           </div>
         )}
       </main>
@@ -1,30 +1,197 @@
-import cv2
+"""Decode roll numbers from ID-card photos: one image, a directory or a zip archive.
+
+    python decode_user_id.py card.jpg
+    python decode_user_id.py id_dump.zip --out ids.csv --workers 8
+    python decode_user_id.py photos/ --out ids.jsonl --post http://localhost:8000/api/students/bulk
+
+Images are decoded in a process pool (one OpenCV thread per worker, so
+throughput grows with cores) using the ZXing -> grayscale -> multi-scale
+cascade. Results stream to CSV or JSONL (by extension) with per-file timing
+and a failure reason. --post sends the decoded students to the bulk import
+endpoint; the name comes from the QR payload ("ROLL|Name") when present,
+otherwise from the file name ("Jane_Doe.jpg" -> "Jane Doe").
+"""
+import argparse
+import csv
+import json
+import os
+import re
 import sys
-import zxingcpp
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from qr_decode import DecodeCascade, ID_CARD_CASCADE
 
-# Path to the uploaded image
-image_path = "/Users/karthikeyadevatha/.gemini/antigravity/brain/f99e7708-54e8-4866-8970-19efae25969a/media__1771103728909.jpg"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+FIELDS = ["file", "status", "roll_no", "name", "codes", "stage", "decode_ms", "error"]
+POST_CHUNK_ROWS = 5000
+PAYLOAD_SEPARATORS = re.compile(r"[|;\n]")
 
-try:
-    print(f"Decoding: {image_path}")
-    img = cv2.imread(image_path)
-    if img is None:
-        print("Error: Could not read image.")
-        sys.exit(1)
+# Per-process state, set up by init_worker
+_cascade = None
+_archive = None
 
-    barcodes = zxingcpp.read_barcodes(img)
-    
-    if not barcodes:
-        # Try resizing or preprocessing
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        barcodes = zxingcpp.read_barcodes(gray)
 
-    if not barcodes:
-        print("No QR code found.")
+def init_worker(archive_path=None):
+    global _cascade, _archive
+    cv2.setNumThreads(1)
+    _cascade = DecodeCascade.from_spec(ID_CARD_CASCADE, adaptive=False)
+    _archive = zipfile.ZipFile(archive_path) if archive_path else None
+
+
+def list_images(source):
+    """Image paths in a directory tree or member names in a zip, sorted."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            names = archive.namelist()
     else:
-        for barcode in barcodes:
-            print(f"Type: {barcode.format}")
-            print(f"Data: {barcode.text}")
+        names = [
+            os.path.relpath(os.path.join(root, name), source)
+            for root, _, files in os.walk(source) for name in files
+        ]
+    return sorted(n for n in names if os.path.splitext(n)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def name_from_file(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return " ".join(part for part in re.split(r"[_\-\s]+", stem) if part).title()
+
+
+def parse_payload(text):
+    """"ROLL|Name" (or ; / newline separated) -> (roll_no, name or None)."""
+    parts = [p.strip() for p in PAYLOAD_SEPARATORS.split(text) if p.strip()]
+    if not parts:
+        return "", None
+    return parts[0], (parts[1] if len(parts) > 1 else None)
+
+
+def decode_file(job):
+    """Runs in a pool process: one image -> result row."""
+    source, name = job
+    row = dict.fromkeys(FIELDS, "")
+    row["file"] = name
+    start = time.perf_counter()
+    try:
+        if _archive is not None:
+            data = np.frombuffer(_archive.read(name), dtype=np.uint8)
+        else:
+            data = np.fromfile(os.path.join(source, name), dtype=np.uint8)
+        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if img is None:
+            row.update(status="unreadable", error="not a decodable image")
+        else:
+            outcome = _cascade.decode(img)
+            texts = list(dict.fromkeys(res["data"].strip() for res in outcome.results if res["data"].strip()))
+            if not texts:
+                row.update(status="no_code", error=f"no QR code found ({', '.join(outcome.timings)})")
+            else:
+                roll_no, payload_name = parse_payload(texts[0])
+                row.update(
+                    status="ok" if len(texts) == 1 else "multiple",
+                    roll_no=roll_no,
+                    name=payload_name or name_from_file(name),
+                    codes=";".join(texts),
+                    stage=outcome.results[0]["stage"],
+                )
+                if len(texts) > 1:
+                    row["error"] = f"{len(texts)} different codes; using the first"
+    except (OSError, KeyError, zipfile.BadZipFile) as e:
+        row.update(status="error", error=str(e))
+    row["decode_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return row
+
+
+class ResultWriter:
+    def __init__(self, path):
+        self.jsonl = path.endswith(".jsonl")
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        if not self.jsonl:
+            self.csv = csv.DictWriter(self.file, fieldnames=FIELDS)
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.jsonl:
+            self.file.write(json.dumps(row) + "\n")
+        else:
+            self.csv.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+def post_students(url, students):
+    import requests
+
+    totals = {"inserted": 0, "skipped": 0, "errors": 0}
+    for i in range(0, len(students), POST_CHUNK_ROWS):
+        response = requests.post(url, json={"students": students[i:i + POST_CHUNK_ROWS]}, timeout=120)
+        response.raise_for_status()
+        result = response.json()
+        for key in totals:
+            totals[key] += result.get(key, 0)
+    print(f"📤 Bulk import: {totals['inserted']} inserted, {totals['skipped']} skipped, {totals['errors']} errors")
+
+
+def decode_single(path):
+    init_worker()
+    row = decode_file((os.path.dirname(path) or ".", os.path.basename(path)))
+    print(f"Decoding: {path}")
+    if row["status"] in ("ok", "multiple"):
+        for code in row["codes"].split(";"):
+            print(f"Data: {code}")
+        print(f"Stage: {row['stage']} ({row['decode_ms']} ms)")
+    else:
+        print(f"Failed: {row['error']}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode roll numbers from ID-card photos")
+    parser.add_argument("source", help="Image file, directory of images or .zip archive")
+    parser.add_argument("--out", type=str, default="decoded_ids.csv", help="Results file (.csv or .jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Decode processes")
+    parser.add_argument("--post", type=str, help="Bulk import URL, e.g. http://localhost:8000/api/students/bulk")
+    args = parser.parse_args()
+
+    if os.path.isfile(args.source) and not zipfile.is_zipfile(args.source):
+        decode_single(args.source)
+        return
+
+    names = list_images(args.source)
+    if not names:
+        print(f"No images found in {args.source}")
+        sys.exit(1)
+    archive = args.source if zipfile.is_zipfile(args.source) else None
+    print(f"🪪 Decoding {len(names)} images from {args.source} with {args.workers} workers")
+
+    writer = ResultWriter(args.out)
+    counts = {}
+    students = {}
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(archive,)) as pool:
+            jobs = ((args.source, name) for name in names)
+            chunksize = max(1, min(64, len(names) // (args.workers * 8)))
+            for done, row in enumerate(pool.map(decode_file, jobs, chunksize=chunksize), start=1):
+                writer.write(row)
+                counts[row["status"]] = counts.get(row["status"], 0) + 1
+                if row["roll_no"] and row["roll_no"] not in students:
+                    students[row["roll_no"]] = {"roll_no": row["roll_no"], "name": row["name"]}
+                if done % 500 == 0:
+                    print(f"  {done}/{len(names)} ({done / (time.perf_counter() - start):.0f} images/s)")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{status} {count}" for status, count in sorted(counts.items()))
+    print(f"✅ {len(names)} images in {elapsed:.1f}s ({len(names) / elapsed:.0f} images/s): {summary}")
+    print(f"📄 Results: {args.out}")
+
+    if args.post and students:
+        post_students(args.post, list(students.values()))
+
 
-except Exception as e:
-    print(f"Error: {e}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""Shared QR decoding for the scanners, the ID-card decoder and the server.
+
+    from qr_decode import DecodeCascade, VISHWAKARMA_CASCADE
+    cascade = DecodeCascade.from_spec(VISHWAKARMA_CASCADE)
+    outcome = cascade.decode(frame)          # results, images, timings
+    cascade.stats()                          # per-stage attempts/hits/cost, current order
+
+A cascade spec lists "backend[:preprocessor]" stages separated by ">"
+(backends: zxing, pyzbar, opencv; preprocessors: raw, gray, clahe,
+threshold, lowres, upscale). Backends that are not installed are skipped.
+"""
+from .backends import BACKENDS, register_backend
+from .cascade import DecodeCascade, DecodeOutcome, Stage, parse_spec
+from .preprocessors import LOW_RES_WIDTH, PREPROCESSORS, register_preprocessor
+
+# Default stage orders of the three entry points
+VISHWAKARMA_CASCADE = "zxing:lowres>zxing>pyzbar:clahe"
+SCANNER_CASCADE = "pyzbar>pyzbar:threshold"
+ID_CARD_CASCADE = "zxing>zxing:gray>zxing:lowres>zxing:upscale"
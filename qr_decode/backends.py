@@ -0,0 +1,76 @@
+import threading
+import cv2
+
+try:
+    import zxingcpp
+    ZXING_AVAILABLE = True
+except ImportError:
+    ZXING_AVAILABLE = False
+
+try:
+    from pyzbar.pyzbar import decode as pyzbar_decode
+    PYZBAR_AVAILABLE = True
+except ImportError:
+    PYZBAR_AVAILABLE = False
+
+# A backend decodes one image into [(text, points)], points in image pixels
+# (top-left, top-right, bottom-right, bottom-left where the engine reports them).
+
+
+class ZXingBackend:
+    name = "zxing"
+    label = "ZXing"
+    available = ZXING_AVAILABLE
+
+    def decode(self, image):
+        results = []
+        for barcode in zxingcpp.read_barcodes(image):
+            pos = barcode.position
+            points = [(p.x, p.y) for p in (pos.top_left, pos.top_right, pos.bottom_right, pos.bottom_left)]
+            results.append((barcode.text, points))
+        return results
+
+
+class PyzbarBackend:
+    name = "pyzbar"
+    label = "PyZbar"
+    available = PYZBAR_AVAILABLE
+
+    def decode(self, image):
+        return [
+            (barcode.data.decode("utf-8", "replace"), [(p.x, p.y) for p in barcode.polygon])
+            for barcode in pyzbar_decode(image)
+        ]
+
+
+class OpenCVBackend:
+    name = "opencv"
+    label = "OpenCV"
+    available = True
+
+    def __init__(self):
+        # Detectors keep per-call state: one per decode thread
+        self._local = threading.local()
+
+    def decode(self, image):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = cv2.QRCodeDetector()
+        ok, texts, points, _ = detector.detectAndDecodeMulti(image)
+        if not ok or points is None:
+            return []
+        return [
+            (text, [(int(x), int(y)) for x, y in quad])
+            for text, quad in zip(texts, points) if text
+        ]
+
+
+BACKENDS = {
+    "zxing": ZXingBackend,
+    "pyzbar": PyzbarBackend,
+    "opencv": OpenCVBackend,
+}
+
+
+def register_backend(name, factory):
+    BACKENDS[name] = factory
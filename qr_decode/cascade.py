@@ -0,0 +1,187 @@
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from .backends import BACKENDS
+from .preprocessors import PREPROCESSORS
+
+
+class DecodeOutcome(NamedTuple):
+    results: List[dict]          # {"data", "type", "stage", "points"} in frame coordinates
+    images: Dict[str, object]    # preprocessed images built during this call, by preprocessor
+    timings: Dict[str, float]    # milliseconds per stage that ran
+
+
+class Stage:
+    """One backend on one preprocessed image, with running statistics."""
+
+    def __init__(self, backend, preprocessor: str):
+        if preprocessor not in PREPROCESSORS:
+            raise ValueError(f"Unknown preprocessor '{preprocessor}' (choose from {sorted(PREPROCESSORS)})")
+        self.backend = backend
+        self.preprocessor = preprocessor
+        self.name = f"{backend.name}:{preprocessor}"
+        self.attempts = 0
+        self.hits = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.attempts if self.attempts else 0.0
+
+    def expected_cost(self) -> float:
+        # Cost per success (Laplace-smoothed): running stages in increasing
+        # cost/p order minimises the expected time to the first hit
+        return self.mean_seconds / ((self.hits + 1) / (self.attempts + 2))
+
+    def stats(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "errors": self.errors,
+            "success_rate": round(self.success_rate, 4),
+            "mean_ms": round(self.mean_seconds * 1000, 3),
+        }
+
+
+def parse_spec(spec: str) -> List[Tuple[str, str]]:
+    """"zxing:lowres>zxing>pyzbar:clahe" -> [(backend, preprocessor), ...]"""
+    stages = []
+    for part in spec.split(">"):
+        backend, _, preprocessor = part.strip().partition(":")
+        stages.append((backend, preprocessor or "raw"))
+    return stages
+
+
+class DecodeCascade:
+    """Runs decode stages in order until one finds a code.
+
+    With adaptive=True the order is re-ranked every reorder_every calls by
+    observed cost per success, and a stage that has never won after
+    min_attempts tries (while others have) is skipped except on every
+    explore_every-th call, so it can earn its place back when conditions
+    change. Stats are shared by all threads using the cascade.
+    """
+
+    def __init__(self, stages: List[Stage], adaptive: bool = True, min_attempts: int = 30,
+                 reorder_every: int = 25, explore_every: int = 50):
+        if not stages:
+            raise ValueError("A decode cascade needs at least one available stage")
+        self.stages = stages
+        self.adaptive = adaptive
+        self.min_attempts = min_attempts
+        self.reorder_every = reorder_every
+        self.explore_every = explore_every
+        self.roi = Stage(stages[0].backend, "raw")
+        self.roi.name = "roi"
+        self._order = list(stages)
+        self._skipped: set = set()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.found = 0
+
+    @classmethod
+    def from_spec(cls, spec: str, **kwargs) -> "DecodeCascade":
+        """Build from "backend[:preprocessor]>..."; unavailable backends are left out."""
+        backends = {}
+        stages = []
+        for backend_name, preprocessor in parse_spec(spec):
+            if backend_name not in BACKENDS:
+                raise ValueError(f"Unknown backend '{backend_name}' (choose from {sorted(BACKENDS)})")
+            if backend_name not in backends:
+                backends[backend_name] = BACKENDS[backend_name]()
+            if backends[backend_name].available:
+                stages.append(Stage(backends[backend_name], preprocessor))
+        return cls(stages, **kwargs)
+
+    def order(self) -> List[str]:
+        with self._lock:
+            return [s.name for s in self._order if s not in self._skipped]
+
+    def decode(self, frame, roi: Optional[Tuple[int, int, int, int]] = None) -> DecodeOutcome:
+        with self._lock:
+            self.calls += 1
+            explore = self.adaptive and self.calls % self.explore_every == 0
+            order = [s for s in self._order if explore or s not in self._skipped]
+
+        images = {}
+        timings = {}
+
+        # Tracked region of interest from the previous detection, with the leading backend
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            results = self._run(self.roi, frame[y0:y1, x0:x1], 1.0, (x0, y0), timings)
+            if results:
+                return self._finish(results, images, timings)
+
+        for stage in order:
+            start = time.perf_counter()
+            image = images.get(stage.preprocessor)
+            if image is None:
+                image = images[stage.preprocessor] = PREPROCESSORS[stage.preprocessor](frame)
+            prep_seconds = time.perf_counter() - start
+            results = self._run(stage, image[0], image[1], (0, 0), timings, prep_seconds)
+            if results:
+                return self._finish(results, images, timings)
+        return self._finish([], images, timings)
+
+    def _run(self, stage: Stage, image, scale: float, offset, timings, extra_seconds: float = 0.0) -> List[dict]:
+        start = time.perf_counter()
+        error = None
+        try:
+            found = stage.backend.decode(image)
+        except Exception as e:  # a native decoder failing on one frame must not stop the scanner
+            found, error = [], e
+        elapsed = time.perf_counter() - start + extra_seconds
+        timings[stage.name] = round(elapsed * 1000, 3)
+
+        with self._lock:
+            stage.attempts += 1
+            stage.seconds += elapsed
+            stage.hits += bool(found)
+            if error is not None:
+                stage.errors += 1
+                if stage.errors == 1:
+                    print(f"⚠️ Decode stage {stage.name} failed: {error}")
+
+        ox, oy = offset
+        return [
+            {
+                "data": text,
+                "type": stage.backend.label,
+                "stage": stage.name,
+                "points": [(int(x / scale) + ox, int(y / scale) + oy) for x, y in points],
+            }
+            for text, points in found
+        ]
+
+    def _finish(self, results, images, timings) -> DecodeOutcome:
+        with self._lock:
+            self.found += bool(results)
+            if self.adaptive and self.calls % self.reorder_every == 0:
+                self._reorder()
+        return DecodeOutcome(results, images, timings)
+
+    def _reorder(self):
+        measured = [s for s in self.stages if s.attempts >= self.min_attempts]
+        if not measured:
+            return
+        # Measured stages by cost per success; the rest keep their configured order behind them
+        ranked = sorted(measured, key=Stage.expected_cost)
+        self._order = ranked + [s for s in self.stages if s not in measured]
+        any_hits = any(s.hits for s in self.stages)
+        self._skipped = {s for s in measured if any_hits and not s.hits}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "found": self.found,
+                "order": [s.name for s in self._order],
+                "skipped": sorted(s.name for s in self._skipped),
+                "stages": {s.name: s.stats() for s in [self.roi] + self.stages if s.attempts},
+            }
@@ -0,0 +1,65 @@
+import threading
+import cv2
+
+LOW_RES_WIDTH = 640     # width of the downscaled pass before full-resolution search
+
+# A preprocessor maps a BGR (or grey) frame to (image, scale): scale is
+# image size / frame size, used to map decoded points back onto the frame.
+
+
+def to_gray(frame):
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def raw(frame):
+    return frame, 1.0
+
+
+def gray(frame):
+    return to_gray(frame), 1.0
+
+
+# CLAHE objects are not safe to share between threads: one cached per decode worker
+_clahe = threading.local()
+
+
+def clahe(frame):
+    """Contrast Limited Adaptive Histogram Equalization: evens out uneven lighting."""
+    instance = getattr(_clahe, "instance", None)
+    if instance is None:
+        instance = _clahe.instance = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return instance.apply(to_gray(frame)), 1.0
+
+
+def threshold(frame):
+    """Adaptive Gaussian threshold (scanner.py's original preprocessing)."""
+    image = cv2.adaptiveThreshold(to_gray(frame), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    return image, 1.0
+
+
+def lowres(frame):
+    """Downscale to LOW_RES_WIDTH: most codes at kiosk distance survive it."""
+    height, width = frame.shape[:2]
+    if width <= LOW_RES_WIDTH:
+        return frame, 1.0
+    scale = LOW_RES_WIDTH / width
+    return cv2.resize(frame, (LOW_RES_WIDTH, int(height * scale)), interpolation=cv2.INTER_AREA), scale
+
+
+def upscale(frame):
+    """2x enlargement for small or distant codes (e.g. ID card photos)."""
+    return cv2.resize(frame, None, fx=2.0, fy=2.0, interpolation=cv2.INTER_CUBIC), 2.0
+
+
+PREPROCESSORS = {
+    "raw": raw,
+    "gray": gray,
+    "clahe": clahe,
+    "threshold": threshold,
+    "lowres": lowres,
+    "upscale": upscale,
+}
+
+
+def register_preprocessor(name, fn):
+    PREPROCESSORS[name] = fn
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+
+def normalize_roll_no(code):
+    # Same rule as the server (server_python/cache.py)
+    return code.strip().upper()
+
+
+class LocalRoster:
+    """Kiosk-side copy of an event's roster, settings and attendance state.
+
+    Downloaded from GET /api/scan/roster at startup and refreshed
+    incrementally in the background (new students only, by id cursor). The
+    last snapshot is kept on disk so a kiosk can start while the server is
+    down. check() decides per code whether a scan is worth sending:
+
+      send       - may change attendance
+      duplicate  - the same code was seen within dedup_ttl seconds
+      unknown    - not a registered roll number (random QR stickers)
+      no_change  - the server would only answer with a cooldown/early check-out notice
+      inactive   - the event is closed
+
+    Until a roster has been loaded every code is sent. An unknown code also
+    triggers an early refresh, so a student registered at the desk is
+    accepted on their next attempt.
+    """
+
+    MIN_REFRESH_GAP = 5.0  # seconds between refreshes triggered by unknown codes
+
+    def __init__(self, api_url, event_id, dedup_ttl=3.0, refresh_interval=60.0, cache_path=None, timeout=5.0):
+        self.roster_url = f"{api_url.rstrip('/')}/roster"
+        self.event_id = event_id
+        self.dedup_ttl = dedup_ttl
+        self.refresh_interval = refresh_interval
+        self.cache_path = cache_path or f"roster_event{event_id}.json"
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._last_refresh = 0.0
+        self._thread = None
+        self.loaded = False
+        self.students = set()
+        self.cursor = 0
+        self.event = {"is_active": True, "cooldown_seconds": 10, "min_checkout_minutes": 1.0}
+        self.attendance = {}
+        self.recent = {}
+        self.counts = {"send": 0, "duplicate": 0, "unknown": 0, "no_change": 0, "inactive": 0}
+
+    # --- Sync ---
+
+    def start(self):
+        try:
+            self.refresh()
+            print(f"📋 Roster: {len(self.students)} students for event {self.event_id}")
+        except requests.RequestException as e:
+            if self._load_cache():
+                print(f"📋 Server unreachable ({e.__class__.__name__}); using cached roster of {len(self.students)} students")
+            else:
+                print("📋 Server unreachable and no cached roster; sending every code")
+        self._thread = threading.Thread(target=self._run, name="roster-refresh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout + 1)
+        self.session.close()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.refresh()
+            except requests.RequestException:
+                pass
+
+    def refresh(self):
+        """Fetch the full snapshot once, then only students added since the cursor."""
+        self._last_refresh = time.time()
+        since = self.cursor if self.loaded else 0
+        response = self.session.get(
+            self.roster_url, params={"event_id": self.event_id, "since": since}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        snapshot = response.json()
+        with self._lock:
+            if snapshot["full"]:
+                self.students = set(snapshot["students"])
+                self.attendance = snapshot.get("attendance", {})
+            else:
+                self.students.update(snapshot["students"])
+            self.cursor = snapshot["cursor"]
+            self.event = snapshot["event"]
+            self.loaded = True
+        self._save_cache()
+
+    def _save_cache(self):
+        with self._lock:
+            data = {
+                "event": self.event, "cursor": self.cursor,
+                "students": sorted(self.students), "attendance": self.attendance,
+            }
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except ValueError:
+            return False
+        with self._lock:
+            self.students = set(data["students"])
+            self.attendance = data.get("attendance", {})
+            self.cursor = data["cursor"]
+            self.event = data["event"]
+            self.loaded = True
+        return True
+
+    # --- Per-code decisions ---
+
+    def check(self, code, now=None):
+        """Return the verdict for a decoded code (see class docstring) and note it as seen."""
+        roll_no = normalize_roll_no(code)
+        now = now or datetime.now()
+        wall = time.time()
+        with self._lock:
+            if self.recent.get(roll_no, 0) > wall:
+                return self._count("duplicate")
+            self.recent[roll_no] = wall + self.dedup_ttl
+            if len(self.recent) > 1000:
+                self.recent = {k: v for k, v in self.recent.items() if v > wall}
+
+            if not self.loaded:
+                return self._count("send")
+            if not self.event.get("is_active", True):
+                return self._count("inactive")
+            if roll_no not in self.students:
+                if wall - self._last_refresh > self.MIN_REFRESH_GAP:
+                    self._wake.set()
+                return self._count("unknown")
+            if not self._may_change(self.attendance.get(roll_no), now):
+                return self._count("no_change")
+            return self._count("send")
+
+    def _may_change(self, log, now):
+        """Mirror of the server's scan_logic.decide_scan: could this scan write anything?"""
+        if not log:
+            return True
+        open_since = log.get("open_since")
+        last = datetime.fromisoformat(open_since or log["check_out_time"] or log["check_in_time"])
+        elapsed = (now - last).total_seconds()
+        if elapsed < self.event["cooldown_seconds"]:
+            return False
+        if not open_since:
+            return True  # re-entry opens a new interval
+        return elapsed >= self.event["min_checkout_minutes"] * 60
+
+    def _count(self, verdict):
+        self.counts[verdict] += 1
+        return verdict
+
+    def record(self, roll_no, status_code, body):
+        """Update local state from the server's answer to a scan of roll_no."""
+        roll_no = normalize_roll_no(body.get("roll_no") or roll_no)
+        detail = str(body.get("detail") or body.get("message") or "")
+        with self._lock:
+            if status_code == 404 and "roll number" in detail:
+                self.students.discard(roll_no)
+            elif status_code == 400 and "no longer active" in detail:
+                self.event["is_active"] = False
+            elif body.get("check_in_time"):
+                self.attendance[roll_no] = {
+                    "check_in_time": body["check_in_time"],
+                    "check_out_time": body.get("check_out_time"),
+                    "status": body.get("status") or "PENDING",
+                    "open_since": body.get("open_since"),
+                }
+
+    def summary(self):
+        return " ".join(f"{verdict} {count}" for verdict, count in self.counts.items())
@@ -0,0 +1,220 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SPOOL_PATH = "scan_spool.jsonl"
+REPLAY_BATCH_SIZE = 200
+
+
+def default_kiosk_id(*cameras):
+    """hostname:camera[+camera...] - how the server's audit log tells kiosks apart."""
+    return f"{socket.gethostname()}:{'+'.join(str(c) for c in cameras)}"
+
+
+class ScanSubmitter:
+    """Background scan poster for the local scanners.
+
+    submit() never blocks the capture/decode loop: scans go into a bounded
+    queue and one worker thread posts them over a pooled keep-alive session,
+    retrying with exponential backoff. When the server stays unreachable the
+    scans (with their original capture timestamps) are appended to an
+    on-disk spool, which is replayed through /api/scan/batch once the server
+    answers again - including spool left over from a previous run.
+    Server answers are handed back through results() for the UI thread.
+    Every request carries kiosk_id as X-Kiosk-Id for the scan audit log.
+    """
+
+    def __init__(self, api_url, kiosk_id=None, spool_path=SPOOL_PATH, max_queue=1000, retries=2,
+                 backoff=0.5, max_backoff=30.0, timeout=2.0):
+        self.scan_url = api_url.rstrip("/")
+        self.batch_url = f"{self.scan_url}/batch"
+        self.spool_path = spool_path
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        if kiosk_id:
+            self.session.headers["X-Kiosk-Id"] = kiosk_id
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._results = queue.Queue()
+        self._spool_lock = threading.Lock()
+        self._spooled = self._count_spool()
+        self._replay_delay = backoff
+        self._next_replay = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"sent": 0, "spooled": 0, "replayed": 0, "failed": 0}
+
+    # --- Capture side ---
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="scan-submitter", daemon=True)
+        self._thread.start()
+        if self._spooled:
+            print(f"📦 {self._spooled} spooled scans from a previous run will be replayed")
+        return self
+
+    def submit(self, roll_no, event_id, captured_at=None, **extra):
+        """Queue a scan; never waits on the network (spools if the queue is full)."""
+        item = {
+            "roll_no": roll_no,
+            "event_id": event_id,
+            "scanned_at": (captured_at or datetime.now()).isoformat(),
+            **extra,
+        }
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self._spool(item)
+
+    def results(self):
+        """Drain (scan, status_code, body) tuples answered since the last call."""
+        answered = []
+        while True:
+            try:
+                answered.append(self._results.get_nowait())
+            except queue.Empty:
+                return answered
+
+    @property
+    def offline(self):
+        return self._spooled > 0
+
+    def stop(self, drain_timeout=2.0):
+        deadline = time.time() + drain_timeout
+        while not self.queue.empty() and time.time() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout + 1)
+        # Anything still queued survives in the spool
+        while True:
+            try:
+                self._spool(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        self.session.close()
+
+    # --- Worker ---
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                item = self.queue.get(timeout=0.25)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                # Keep capture order: once scans are spooled, new ones queue up behind them
+                if self.offline or not self._send(item):
+                    self._spool(item)
+
+            if self.offline and time.time() >= self._next_replay:
+                self._replay()
+
+    def _send(self, item):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(self.scan_url, json=item, timeout=self.timeout)
+            except requests.RequestException:
+                response = None
+            if response is not None and response.status_code < 500:
+                self.stats["sent"] += 1
+                self._report(item, response.status_code, _json(response))
+                return True
+            if attempt < self.retries and not self._stop.is_set():
+                time.sleep(self.backoff * (2 ** attempt))
+        self.stats["failed"] += 1
+        return False
+
+    def _replay(self):
+        with self._spool_lock:
+            items = self._read_spool()
+        sent = 0
+        try:
+            for i in range(0, len(items), REPLAY_BATCH_SIZE):
+                chunk = items[i:i + REPLAY_BATCH_SIZE]
+                response = self.session.post(self.batch_url, json={"scans": chunk}, timeout=self.timeout * 5)
+                if response.status_code >= 500:
+                    break
+                body = _json(response)
+                if response.status_code == 200 and isinstance(body, list):
+                    for scan, result in zip(chunk, body):
+                        self._report(scan, result.get("error_code") or 200, result)
+                else:
+                    # Whole batch rejected (e.g. validation): report and drop, retrying cannot help
+                    for scan in chunk:
+                        self._report(scan, response.status_code, body)
+                sent += len(chunk)
+        except requests.RequestException:
+            pass
+
+        with self._spool_lock:
+            # Drop what was delivered, keep anything spooled meanwhile
+            remaining = self._read_spool()[sent:]
+            self._write_spool(remaining)
+        self.stats["replayed"] += sent
+
+        if self._spooled:
+            self._next_replay = time.time() + self._replay_delay
+            self._replay_delay = min(self._replay_delay * 2, self.max_backoff)
+        else:
+            print(f"🔌 Back online: replayed {self.stats['replayed']} spooled scans")
+            self._replay_delay = self.backoff
+
+    def _report(self, item, status_code, body):
+        self._results.put((item, status_code, body))
+
+    # --- Spool file ---
+
+    def _spool(self, item):
+        with self._spool_lock:
+            if not self._spooled:
+                print("📴 Server unreachable: spooling scans to disk")
+                self._next_replay = time.time() + self._replay_delay
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item) + "\n")
+            self._spooled += 1
+            self.stats["spooled"] += 1
+
+    def _read_spool(self):
+        if not os.path.exists(self.spool_path):
+            return []
+        items = []
+        with open(self.spool_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    continue
+        return items
+
+    def _write_spool(self, items):
+        tmp_path = f"{self.spool_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item) + "\n")
+        os.replace(tmp_path, self.spool_path)
+        self._spooled = len(items)
+
+    def _count_spool(self):
+        return len(self._read_spool())
+
+
+def _json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return {"detail": response.text}
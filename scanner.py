@@ -1,22 +1,33 @@
 import cv2
-import requests
 import time
 import argparse
 import numpy as np
-from pyzbar.pyzbar import decode
+from datetime import datetime
+from qr_decode import DecodeCascade, PREPROCESSORS, SCANNER_CASCADE
+from scan_submitter import ScanSubmitter, default_kiosk_id
+from scan_roster import LocalRoster
 
 # CONFIGURATION DEFAULT
 API_URL = "http://localhost:8000/api/scan"
 EVENT_ID = 1
 
-def preprocess_frame(frame):
-    """Enhance frame for better QR detection."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    # Adaptive thresholding to handle lighting variations
-    thresh = cv2.adaptiveThreshold(
-        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-    )
-    return thresh
+# Overlays for codes rejected on the kiosk without a server round-trip
+LOCAL_BANNERS = {
+    "unknown": ((0, 0, 255), "NOT REGISTERED"),
+    "no_change": ((0, 165, 255), "DUPLICATE SCAN"),
+    "inactive": ((0, 0, 255), "EVENT CLOSED"),
+}
+
+def result_banner(status_code, body, data):
+    """Print an API answer and return the (color, text) overlay for it."""
+    if status_code in [200, 201]:
+        print(f"✅ API: {body.get('message', 'Success')}")
+        return (0, 255, 0), f"SUCCESS: {data}"
+    if status_code == 409:
+        print(f"⚠️ Duplicate/Warning: {body.get('message')}")
+        return (0, 165, 255), "DUPLICATE SCAN"
+    print(f"❌ Error {status_code}: {body.get('detail') or body.get('message')}")
+    return (0, 0, 255), "ERROR"
 
 def main():
     parser = argparse.ArgumentParser(description="QR Event Attendance Scanner")
@@ -25,9 +36,21 @@ def main():
     parser.add_argument("--event", type=int, default=1, help="Event ID (default: 1)")
     parser.add_argument("--api", type=str, default="http://localhost:8000/api/scan", help="API Endpoint")
     parser.add_argument("--mirror", action="store_true", help="Start with mirror mode enabled")
+    parser.add_argument("--cascade", type=str, default=SCANNER_CASCADE, help="Decode stages, e.g. pyzbar>pyzbar:threshold>zxing")
+    parser.add_argument("--static-order", action="store_true", help="Keep the cascade order instead of adapting it")
+    parser.add_argument("--dedup-ttl", type=float, default=3.0, help="Seconds to ignore a code after it was seen")
+    parser.add_argument("--spool", type=str, default="scan_spool.jsonl", help="Offline spool file for unsent scans")
+    parser.add_argument("--kiosk", type=str, default=None, help="Kiosk ID for the server's audit log (default: hostname:camera)")
     args = parser.parse_args()
 
+    try:
+        cascade = DecodeCascade.from_spec(args.cascade, adaptive=not args.static_order)
+    except ValueError as e:
+        print(f"❌ {e}: install pyzbar or pass e.g. --cascade zxing>zxing:gray")
+        return
+
     source = args.stream if args.stream else args.camera
+    kiosk_id = args.kiosk or default_kiosk_id(source)
     cap = cv2.VideoCapture(source)
     
     # Try to set high resolution
@@ -38,6 +61,8 @@ def main():
     print(f"📷 Source: {source}")
     print(f"📅 Event ID: {args.event}")
     print(f"📡 API: {args.api}")
+    print(f"🏷️ Kiosk: {kiosk_id}")
+    print(f"🧩 Decode: {' -> '.join(cascade.order())}")
     print("----------------------------------------")
     print("Controls:")
     print(" [q] Quit")
@@ -47,9 +72,10 @@ def main():
 
     mirror_mode = args.mirror
     debug_mode = False
-    last_scan_time = 0
-    cooldown_seconds = 3.0
-    last_scanned_data = ""
+    banner = None
+    banner_until = 0
+    submitter = ScanSubmitter(args.api, kiosk_id=kiosk_id, spool_path=args.spool).start()
+    roster = LocalRoster(args.api, args.event, dedup_ttl=args.dedup_ttl).start()
 
     while True:
         success, frame = cap.read()
@@ -57,69 +83,56 @@ def main():
             print("❌ Failed to capture frame. Retrying...")
             time.sleep(1)
             continue
+        captured_at = datetime.now()
 
         if mirror_mode:
             frame = cv2.flip(frame, 1)
 
-        # Preprocessing for detection
-        clean_frame = preprocess_frame(frame)
-        
-        # Decode QR codes
-        # We try decoding on both original and preprocessed frames for maximum robustness
-        decoded_objects = decode(frame)
-        if not decoded_objects:
-            decoded_objects = decode(clean_frame)
-
-        for obj in decoded_objects:
-            data = obj.data.decode("utf-8").strip()
+        # Decode: stages run in order until one finds a code (the
+        # raw frame, then the adaptive threshold, by default)
+        outcome = cascade.decode(frame)
+
+        for res in outcome.results:
+            data = res["data"].strip()
             
             # Visual Feedback
-            points = obj.polygon
+            points = res["points"]
             if len(points) == 4:
                 pts = np.array(points, np.int32)
                 pts = pts.reshape((-1, 1, 2))
                 cv2.polylines(frame, [pts], True, (0, 255, 0), 3)
 
-            text_pos = (points[0].x, points[0].y - 10)
+            text_pos = (points[0][0], points[0][1] - 10) if points else (20, 80)
             cv2.putText(frame, data, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
-            # Logic to prevent spamming
-            current_time = time.time()
-            if (current_time - last_scan_time > cooldown_seconds) or (data != last_scanned_data):
+            # Per-code dedup plus local roster/state checks (several codes can be in view)
+            verdict = roster.check(data, now=captured_at)
+            if verdict == "send":
                 print(f"🔍 Scanned: {data}")
-                
-                # Send to API
-                try:
-                    payload = {"roll_no": data, "event_id": args.event}
-                    # Timeout to prevent hanging
-                    response = requests.post(args.api, json=payload, timeout=2)
-                    
-                    if response.status_code in [200, 201]:
-                        res_json = response.json()
-                        msg = res_json.get("message", "Success")
-                        print(f"✅ API: {msg}")
-                        # Draw success overlay
-                        cv2.rectangle(frame, (0, 0), (frame.shape[1], 50), (0, 255, 0), -1)
-                        cv2.putText(frame, f"SUCCESS: {data}", (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-                    elif response.status_code == 409:
-                        print(f"⚠️ Duplicate/Warning: {response.json().get('message')}")
-                        cv2.rectangle(frame, (0, 0), (frame.shape[1], 50), (0, 165, 255), -1) 
-                        cv2.putText(frame, "DUPLICATE SCAN", (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-                    else:
-                        print(f"❌ Error {response.status_code}: {response.text}")
-                        cv2.rectangle(frame, (0, 0), (frame.shape[1], 50), (0, 0, 255), -1)
-                        cv2.putText(frame, "ERROR", (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-
-                except Exception as e:
-                    print(f"⚠️ Network Error: {e}")
-
-                last_scan_time = current_time
-                last_scanned_data = data
+                # Queue for the background submitter (never blocks this loop)
+                submitter.submit(data, args.event, captured_at=captured_at)
+            elif verdict != "duplicate":
+                print(f"🚫 {data}: {verdict.replace('_', ' ')} (not sent)")
+                banner = LOCAL_BANNERS[verdict]
+                banner_until = time.time() + 1.5
+
+        # Answers arrive asynchronously; keep the latest one on screen briefly
+        for scan, status_code, body in submitter.results():
+            roster.record(scan["roll_no"], status_code, body)
+            banner = result_banner(status_code, body, scan["roll_no"])
+            banner_until = time.time() + 1.5
+        if banner and time.time() < banner_until:
+            color, text = banner
+            cv2.rectangle(frame, (0, 0), (frame.shape[1], 50), color, -1)
+            cv2.putText(frame, text, (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        if submitter.offline:
+            cv2.putText(frame, "OFFLINE - scans spooled", (20, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
 
         # Show feeds
         cv2.imshow("Events Attendance QR Scanner (Press 'q' to quit)", frame)
         if debug_mode:
-            cv2.imshow("Debug Threshold", clean_frame)
+            threshold = outcome.images.get("threshold") or PREPROCESSORS["threshold"](frame)
+            cv2.imshow("Debug Threshold", threshold[0])
 
         # Key Handling
         key = cv2.waitKey(1) & 0xFF
@@ -135,6 +148,9 @@ def main():
             print(f"🐞 Debug Mode: {'ON' if debug_mode else 'OFF'}")
 
     cap.release()
+    print(f"🧩 Decode stats: {cascade.stats()}")
+    submitter.stop()
+    roster.stop()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
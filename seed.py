@@ -1,9 +1,11 @@
 from server_python import database, models
+from server_python.migrations import run_migrations
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
 # Initialize DB
 database.Base.metadata.create_all(bind=database.engine)
+run_migrations(database.engine)
 db = database.SessionLocal()
 
 def seed():
@@ -63,6 +65,10 @@ def seed():
         else:
             print(f"Student {s['name']} already exists.")
 
+    # A running server picks up these rows without a restart: unknown roll
+    # numbers and event ids fall back to a database lookup, and cached events
+    # are re-read after ATTENDANCE_EVENT_CACHE_TTL seconds.
+
     print("Seeding complete! 🌱")
     db.close()
 
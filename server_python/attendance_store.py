@@ -0,0 +1,111 @@
+from datetime import datetime
+from typing import Iterable
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from . import models
+from .cache import CachedEvent, CachedStudent
+from .scan_logic import (
+    COOLDOWN_SECONDS, MIN_CHECKOUT_MINUTES, LogState,
+    check_in_response, check_out_response, decide_scan,
+)
+
+logs = models.AttendanceLog.__table__
+
+
+def elapsed_ms(start, end):
+    """SQL twin of scan_logic.elapsed_ms: whole milliseconds between two ISO timestamps.
+
+    julianday() differences carry float noise (60 minutes comes out as
+    59.9999998), which must not decide PRESENT vs ABSENT at the boundary.
+    """
+    return func.round((func.julianday(end) - func.julianday(start)) * 86400000.0)
+
+
+def upsert_scan(db: Session, event: CachedEvent, student: CachedStudent, roll_no: str, now: datetime) -> dict:
+    """Apply one scan as a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING.
+
+    The insert is the first check-in; the conflict branch either closes the
+    open interval (adding it to the running total in duration_minutes and
+    deciding PRESENT/ABSENT from that total) or opens a new one on re-entry,
+    guarded by the same cooldown / minimum-duration rules as decide_scan.
+    Interval rows follow from the triggers in intervals.py. Nothing is
+    returned when the guard rejects the update; only then is the row read
+    to explain why.
+    """
+    now_iso = now.isoformat()
+    inside = logs.c.open_since.isnot(None)
+    last_action = func.coalesce(logs.c.open_since, logs.c.check_out_time, logs.c.check_in_time)
+    seconds_since_last = elapsed_ms(last_action, now_iso) / 1000.0
+    interval_minutes = elapsed_ms(logs.c.open_since, now_iso) / 60000.0
+    total_minutes = func.coalesce(logs.c.duration_minutes, 0.0) + interval_minutes
+
+    # SQLite evaluates every SET expression against the row as it was before the update
+    stmt = sqlite_insert(logs).values(
+        roll_no=roll_no,
+        event_id=event.id,
+        check_in_time=now_iso,
+        status="PENDING",
+        open_since=now_iso,
+    ).on_conflict_do_update(
+        index_elements=[logs.c.event_id, logs.c.roll_no],
+        set_={
+            "open_since": case((inside, None), else_=now_iso),
+            "check_out_time": case((inside, now_iso), else_=logs.c.check_out_time),
+            "duration_minutes": case((inside, total_minutes), else_=logs.c.duration_minutes),
+            "status": case(
+                (inside, case((total_minutes >= event.required_minutes, "PRESENT"), else_="ABSENT")),
+                (logs.c.status == "PRESENT", "PRESENT"),
+                else_="PENDING",
+            ),
+        },
+        where=and_(
+            seconds_since_last >= COOLDOWN_SECONDS,
+            or_(~inside, interval_minutes >= MIN_CHECKOUT_MINUTES),
+        ),
+    ).returning(
+        logs.c.check_in_time, logs.c.check_out_time, logs.c.duration_minutes, logs.c.status, logs.c.open_since
+    )
+
+    row = db.execute(stmt).first()
+    if row is not None:
+        state = LogState(*row)
+        if state.duration_minutes is not None:
+            # RETURNING hands back whole-number REALs as integers (SQLite's storage form)
+            state = state._replace(duration_minutes=float(state.duration_minutes))
+        if state.open_since is not None:
+            return check_in_response(student, roll_no, state)
+        return check_out_response(event, student, roll_no, state)
+
+    # Rejected scan: read the row to report DUPLICATE_BLOCKED / EARLY_CHECKOUT_WARNING
+    log = db.query(models.AttendanceLog).filter(
+        models.AttendanceLog.event_id == event.id,
+        models.AttendanceLog.roll_no == roll_no
+    ).first()
+    result, state = decide_scan(log, event, student, roll_no, now)
+    if state is not None:
+        # Both paths count whole milliseconds, so this should not happen; keep them consistent if it does
+        write_log_states(db, [(event.id, roll_no, state)])
+    return result
+
+
+def write_log_states(db: Session, states: Iterable[tuple]):
+    """Upsert absolute (event_id, roll_no, LogState) rows in one executemany."""
+    rows = [
+        {"event_id": event_id, "roll_no": roll_no, **state._asdict()}
+        for event_id, roll_no, state in states
+    ]
+    if not rows:
+        return
+    stmt = sqlite_insert(logs)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[logs.c.event_id, logs.c.roll_no],
+        set_={
+            "check_in_time": stmt.excluded.check_in_time,
+            "check_out_time": stmt.excluded.check_out_time,
+            "duration_minutes": stmt.excluded.duration_minutes,
+            "status": stmt.excluded.status,
+            "open_since": stmt.excluded.open_since,
+        },
+    )
+    db.execute(stmt, rows)
@@ -0,0 +1,132 @@
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Optional
+from fastapi import HTTPException
+from . import database, models
+
+# Structured scan audit log. record() only appends a tuple to an in-memory
+# deque (atomic, no lock, no I/O), so the scan response never waits on it;
+# a background thread inserts the queued records into scan_audit_log in one
+# executemany per flush. If the writer falls far behind, the oldest
+# unwritten records are dropped (and counted) rather than growing memory.
+FLUSH_INTERVAL_MS = int(os.environ.get("ATTENDANCE_AUDIT_FLUSH_MS", "500"))
+MAX_QUEUED = int(os.environ.get("ATTENDANCE_AUDIT_QUEUE", "100000"))
+
+FIELDS = (
+    "event_id", "kiosk_id", "source", "raw_payload", "roll_no", "outcome",
+    "status_code", "detail", "scanned_at", "received_at", "latency_ms",
+)
+
+
+def error_outcome(e: HTTPException) -> str:
+    """Outcome name for a scan rejected before reaching the state machine."""
+    detail = str(e.detail)
+    if e.status_code == 404:
+        return "UNKNOWN_ROLL_NO" if "roll number" in detail else "UNKNOWN_EVENT"
+    if e.status_code == 400 and "no longer active" in detail:
+        return "EVENT_INACTIVE"
+    return "INVALID"
+
+
+class ScanAuditLog:
+    def __init__(self, session_factory=None, flush_interval: float = FLUSH_INTERVAL_MS / 1000,
+                 max_queued: int = MAX_QUEUED):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._queue: Deque[tuple] = deque()
+        self.max_queued = max_queued
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    # --- Lifecycle ---
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="scan-audit", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Scan audit flush failed, will retry: {e}")
+
+    # --- Scan path ---
+
+    def record(self, event_id: int, raw_payload: str, roll_no: str, outcome: str, status_code: int,
+               latency_ms: float, kiosk_id: Optional[str] = None, source: str = "scan",
+               detail: Optional[str] = None, scanned_at: Optional[datetime] = None):
+        if self._thread is None:
+            self.start()
+        if len(self._queue) >= self.max_queued:
+            try:
+                self._queue.popleft()
+                self.dropped += 1
+            except IndexError:
+                pass
+        self._queue.append((
+            event_id, kiosk_id, source, raw_payload, roll_no, outcome, status_code, detail,
+            scanned_at.isoformat() if scanned_at else None, datetime.now().isoformat(), round(latency_ms, 3),
+        ))
+
+    def record_result(self, request, result: dict, latency_ms: float, kiosk_id: Optional[str], source: str = "scan"):
+        """Audit one scan response (process_scan result or a per-item ERROR of a batch)."""
+        if result["action"] == "ERROR":
+            outcome = error_outcome(HTTPException(status_code=result["error_code"], detail=result["message"]))
+            status_code, detail = result["error_code"], result["message"]
+        else:
+            outcome, status_code, detail = result["action"], 200, result.get("message")
+        self.record(
+            request.event_id, request.roll_no, result.get("roll_no") or "", outcome, status_code,
+            latency_ms, kiosk_id, source, detail, request.scanned_at,
+        )
+
+    # --- Writer ---
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            batch = []
+            while True:
+                try:
+                    batch.append(self._queue.popleft())
+                except IndexError:
+                    break
+            if not batch:
+                return 0
+            db = (self.session_factory or database.SessionLocal)()
+            try:
+                db.execute(models.ScanAuditLog.__table__.insert(), [dict(zip(FIELDS, row)) for row in batch])
+                db.commit()
+            except Exception:
+                db.rollback()
+                # Put the batch back in front, keeping order, for the next attempt
+                self._queue.extendleft(reversed(batch))
+                raise
+            finally:
+                db.close()
+            self.written += len(batch)
+            return len(batch)
+
+    def stats(self) -> dict:
+        return {"queued": len(self._queue), "written": self.written, "dropped": self.dropped}
+
+
+log = ScanAuditLog()
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models
+
+# Events are re-read after this many seconds, so a finalize or an edit made by
+# another process (seed.py, the Node server) reaches the scan path.
+EVENT_TTL_SECONDS = float(os.environ.get("ATTENDANCE_EVENT_CACHE_TTL", "5"))
+
+
+def normalize_roll_no(roll_no: str) -> str:
+    """Same normalization create_student and scan_qr apply to roll numbers."""
+    return roll_no.strip().upper()
+
+
+class CachedStudent(NamedTuple):
+    id: int
+    roll_no: str
+    name: str
+
+
+class CachedEvent(NamedTuple):
+    id: int
+    title: str
+    is_active: bool
+    duration_minutes: int
+    min_attendance_percent: float
+
+    @property
+    def required_minutes(self) -> float:
+        return self.duration_minutes * (self.min_attendance_percent / 100.0)
+
+
+class RosterCache:
+    """In-process cache for the scan hot path.
+
+    Holds normalized roll_no -> student (the whole roster is loaded in one
+    query on first use) and event_id -> event settings for event_ttl
+    seconds. Writers add the students they insert and call invalidate_event;
+    a roster miss falls back to one indexed lookup so students inserted by
+    another process (seed.py, the Node server) are still found.
+    """
+
+    def __init__(self, event_ttl: float = EVENT_TTL_SECONDS):
+        self._lock = threading.Lock()
+        self._students: Dict[str, CachedStudent] = {}
+        self._roster_loaded = False
+        self._events: Dict[int, Tuple[CachedEvent, float]] = {}
+        self.event_ttl = event_ttl
+        self._closing: Set[int] = set()
+        self.hits = 0
+        self.misses = 0
+        self.roster_loads = 0
+
+    # --- Students ---
+
+    def get_student(self, db: Session, roll_no: str) -> Optional[CachedStudent]:
+        key = normalize_roll_no(roll_no)
+        with self._lock:
+            loaded = self._roster_loaded
+            student = self._students.get(key)
+            if student is not None:
+                self.hits += 1
+                return student
+            self.misses += 1
+
+        if not loaded:
+            self._load_roster(db)
+            with self._lock:
+                student = self._students.get(key)
+            if student is not None:
+                return student
+
+        # Not in the snapshot: the students.upper(roll_no) index makes this a point lookup
+        row = db.query(models.Student.id, models.Student.roll_no, models.Student.name).filter(
+            func.upper(models.Student.roll_no) == key
+        ).first()
+        if not row:
+            return None
+        student = CachedStudent(row.id, row.roll_no, row.name)
+        with self._lock:
+            self._students[key] = student
+        return student
+
+    def _load_roster(self, db: Session):
+        rows = db.query(models.Student.id, models.Student.roll_no, models.Student.name).all()
+        students = {normalize_roll_no(r.roll_no): CachedStudent(r.id, r.roll_no, r.name) for r in rows}
+        with self._lock:
+            self._students = students
+            self._roster_loaded = True
+            self.roster_loads += 1
+
+    def add_student(self, student: CachedStudent):
+        self.add_students([student])
+
+    def add_students(self, students: Iterable[CachedStudent]):
+        """Add newly committed students without dropping the loaded roster."""
+        with self._lock:
+            for student in students:
+                self._students[normalize_roll_no(student.roll_no)] = student
+
+    def invalidate_students(self):
+        with self._lock:
+            self._students = {}
+            self._roster_loaded = False
+
+    # --- Events ---
+
+    def get_event(self, db: Session, event_id: int) -> Optional[CachedEvent]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._events.get(event_id)
+            if cached is not None and now - cached[1] < self.event_ttl:
+                self.hits += 1
+                event = cached[0]
+                return event._replace(is_active=False) if event_id in self._closing else event
+            self.misses += 1
+
+        row = db.query(models.Event).filter(models.Event.id == event_id).first()
+        if not row:
+            return None
+        event = CachedEvent(
+            id=row.id,
+            title=row.title,
+            is_active=bool(row.is_active),
+            duration_minutes=row.duration_minutes,
+            min_attendance_percent=row.min_attendance_percent,
+        )
+        with self._lock:
+            self._events[event_id] = (event, now)
+            return event._replace(is_active=False) if event_id in self._closing else event
+
+    def close_event(self, event_id: int):
+        """Report the event inactive to scans until invalidate_event(event_id).
+
+        Finalize and delete call this before touching the event's logs, so
+        no scan can write to it between their journal sync and their commit.
+        """
+        with self._lock:
+            self._closing.add(event_id)
+
+    def invalidate_event(self, event_id: Optional[int] = None):
+        with self._lock:
+            if event_id is None:
+                self._events = {}
+                self._closing = set()
+            else:
+                self._events.pop(event_id, None)
+                self._closing.discard(event_id)
+
+    def invalidate_all(self):
+        self.invalidate_students()
+        self.invalidate_event()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "roster_loaded": self._roster_loaded,
+                "roster_size": len(self._students),
+                "roster_loads": self.roster_loads,
+                "cached_events": len(self._events),
+            }
+
+
+roster_cache = RosterCache()
@@ -0,0 +1,108 @@
+"""Per-event attendance counters (event_counters).
+
+The counters are kept current by SQLite triggers on attendance_logs (see
+migrations.py), so every writer - single scans, batches, the write-behind
+journal, finalize and delete - updates them in its own transaction. Each
+change bumps `version`, which /api/events/{id}/stats serves as its ETag.
+
+Recompute them from attendance_logs with:
+
+    python -m server_python.counters rebuild [--event ID]
+"""
+import argparse
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+REBUILD_COUNTERS = """
+INSERT INTO event_counters (event_id, total, present, absent, pending, version)
+SELECT e.id,
+       COUNT(l.id),
+       COALESCE(SUM(l.status = 'PRESENT'), 0),
+       COALESCE(SUM(l.status = 'ABSENT'), 0),
+       COALESCE(SUM(l.status = 'PENDING'), 0),
+       1
+FROM events e LEFT JOIN attendance_logs l ON l.event_id = e.id
+WHERE :event_id IS NULL OR e.id = :event_id
+GROUP BY e.id
+ON CONFLICT (event_id) DO UPDATE SET
+    total = excluded.total,
+    present = excluded.present,
+    absent = excluded.absent,
+    pending = excluded.pending,
+    version = event_counters.version + 1
+"""
+
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_counters_insert AFTER INSERT ON attendance_logs
+    BEGIN
+        INSERT OR IGNORE INTO event_counters (event_id) VALUES (NEW.event_id);
+        UPDATE event_counters SET
+            total = total + 1,
+            present = present + (NEW.status = 'PRESENT'),
+            absent = absent + (NEW.status = 'ABSENT'),
+            pending = pending + (NEW.status = 'PENDING'),
+            version = version + 1
+        WHERE event_id = NEW.event_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_counters_update AFTER UPDATE OF status ON attendance_logs
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        UPDATE event_counters SET
+            present = present - (OLD.status = 'PRESENT') + (NEW.status = 'PRESENT'),
+            absent = absent - (OLD.status = 'ABSENT') + (NEW.status = 'ABSENT'),
+            pending = pending - (OLD.status = 'PENDING') + (NEW.status = 'PENDING'),
+            version = version + 1
+        WHERE event_id = NEW.event_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_counters_delete AFTER DELETE ON attendance_logs
+    BEGIN
+        UPDATE event_counters SET
+            total = total - 1,
+            present = present - (OLD.status = 'PRESENT'),
+            absent = absent - (OLD.status = 'ABSENT'),
+            pending = pending - (OLD.status = 'PENDING'),
+            version = version + 1
+        WHERE event_id = OLD.event_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_event_counters_event_delete AFTER DELETE ON events
+    BEGIN
+        DELETE FROM event_counters WHERE event_id = OLD.id;
+    END
+    """,
+]
+
+
+def rebuild_counters(conn: Connection, event_id: Optional[int] = None) -> int:
+    """Recompute counters from attendance_logs; returns the number of events rebuilt."""
+    if event_id is None:
+        conn.execute(text("DELETE FROM event_counters WHERE event_id NOT IN (SELECT id FROM events)"))
+    return conn.execute(text(REBUILD_COUNTERS), {"event_id": event_id}).rowcount
+
+
+def main():
+    from . import models  # registers the tables on Base
+    from .database import engine, Base
+    from .migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Maintain per-event attendance counters")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--event", type=int, help="Only this event ID (default: all events)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        rebuilt = rebuild_counters(conn, args.event)
+    print(f"✅ Rebuilt counters for {rebuilt} event(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,32 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from .storage import DATABASE_URL, create_engines
 
-SQLITE_DATABASE_URL = "sqlite:///./attendance.db"
-
-engine = create_engine(
-    SQLITE_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Writes (scans, imports, admin changes) use the single writer connection;
+# read-only routes use the reader pool (see storage.py)
+engine, read_engine = create_engines(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
+def bind_engines(write_engine, reader_engine):
+    """Point both session factories at other engines (benchmarks, tools)."""
+    global engine, read_engine
+    engine, read_engine = write_engine, reader_engine
+    SessionLocal.configure(bind=write_engine)
+    ReadSessionLocal.configure(bind=reader_engine)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
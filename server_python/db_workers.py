@@ -0,0 +1,187 @@
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from fastapi import HTTPException
+from . import database
+
+# Database access for the async routes. SQLite takes one writer at a time,
+# so every write goes through a single writer thread that commits whole
+# groups of queued jobs at once; reads run on a small dedicated pool. The
+# event loop only awaits futures, so scans and dashboards no longer occupy
+# slots of the shared request threadpool, and concurrency is bounded by
+# connections (one writer, READ_WORKERS readers) rather than threads.
+READ_WORKERS = int(os.environ.get("ATTENDANCE_DB_READERS", "4"))
+MAX_GROUP_JOBS = 64
+
+
+class DBReader:
+    """Runs fn(db, *args) on a bounded pool of reader threads, one session per call."""
+
+    def __init__(self, workers: int = READ_WORKERS):
+        self.workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db-read")
+            return self._pool
+
+    async def run(self, fn: Callable, *args):
+        # In the caller's context, so the queries count toward its request's metrics
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._executor(), ctx.run, _read, fn, args)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+def _read(fn, args):
+    db = database.ReadSessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+class _Job:
+    __slots__ = ("fn", "args", "on_commit", "loop", "future", "ctx", "result", "error")
+
+    def __init__(self, fn, args, on_commit, loop, future, ctx):
+        self.fn, self.args, self.on_commit = fn, args, on_commit
+        self.loop, self.future, self.ctx = loop, future, ctx
+        self.result = self.error = None
+
+
+class DBWriter:
+    """Single writer thread with group commit.
+
+    run(fn, *args) queues a job and awaits its result. The writer takes every
+    job queued so far (up to MAX_GROUP_JOBS), runs them in order on one
+    session and commits once, so a burst of scans costs one transaction
+    instead of one each. A job may raise HTTPException only before it writes
+    (process_scan validates first); that error goes back to its caller alone.
+    Any other error rolls the group back and its jobs are retried one
+    transaction each, so one bad job cannot fail its neighbours.
+    on_commit(db, result) runs after the commit, e.g. to publish live deltas.
+    Each job and its hook run in the submitting request's context, so its own
+    queries are credited to that request's metrics.
+    """
+
+    def __init__(self, max_group: int = MAX_GROUP_JOBS):
+        self.max_group = max_group
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.commits = 0
+        self.jobs = 0
+        self.retried_groups = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    async def run(self, fn: Callable, *args, on_commit: Optional[Callable] = None):
+        if self._thread is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put(_Job(fn, args, on_commit, loop, future, contextvars.copy_context()))
+        return await future
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            group = [job]
+            while len(group) < self.max_group:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._commit(group)
+                    return
+                group.append(job)
+            self._commit(group)
+
+    def _commit(self, group: List[_Job]):
+        try:
+            self._apply(group)
+        except Exception as e:
+            if len(group) == 1:
+                group[0].error = e
+            else:
+                self.retried_groups += 1
+                for job in group:
+                    try:
+                        self._apply([job])
+                    except Exception as job_error:
+                        job.error = job_error
+        for job in group:
+            job.loop.call_soon_threadsafe(_settle, job.future, job.result, job.error)
+
+    def _apply(self, group: List[_Job]):
+        db = database.SessionLocal()
+        try:
+            for job in group:
+                job.result = job.error = None
+                try:
+                    job.result = job.ctx.run(job.fn, db, *job.args)
+                except HTTPException as e:
+                    job.error = e
+            db.commit()
+            self.commits += 1
+            self.jobs += len(group)
+            for job in group:
+                if job.on_commit is not None and job.error is None:
+                    try:
+                        job.ctx.run(job.on_commit, db, job.result)
+                    except Exception as e:
+                        print(f"⚠️ Post-commit hook failed: {e}")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "commits": self.commits,
+            "jobs": self.jobs,
+            "jobs_per_commit": round(self.jobs / self.commits, 2) if self.commits else 0,
+            "retried_groups": self.retried_groups,
+        }
+
+
+def _settle(future: asyncio.Future, result, error):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+reader = DBReader()
+writer = DBWriter()
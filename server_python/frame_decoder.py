@@ -0,0 +1,150 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Server-side decoding for thin clients (POST /api/scan/frame). Frames are
+# decoded in a small process pool so neither the event loop nor the request
+# threadpool does CPU-heavy image work; admission limits keep image traffic
+# from crowding out ordinary roll-number scans.
+DECODE_WORKERS = int(os.environ.get("ATTENDANCE_FRAME_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_PENDING_FRAMES = int(os.environ.get("ATTENDANCE_FRAME_QUEUE", "32"))
+MAX_CLIENT_REQUESTS = int(os.environ.get("ATTENDANCE_FRAME_CLIENT_LIMIT", "2"))
+MAX_FRAME_BYTES = 5 * 1024 * 1024
+MAX_FRAMES_PER_REQUEST = 16
+
+
+class FrameLimitExceeded(Exception):
+    pass
+
+
+_cascade = None
+
+
+def decode_image(data: bytes) -> dict:
+    """Runs in a pool process: image bytes -> decoded codes via the Vishwakarma cascade."""
+    global _cascade
+    import cv2
+    import numpy as np
+    from qr_decode import DecodeCascade, VISHWAKARMA_CASCADE
+
+    if _cascade is None:
+        # One adaptive cascade per worker process, learning across requests
+        _cascade = DecodeCascade.from_spec(VISHWAKARMA_CASCADE)
+
+    start = time.perf_counter()
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return {"codes": [], "error": "Unreadable image (expected JPEG or PNG)", "decode_ms": 0.0}
+    outcome = _cascade.decode(frame)
+    return {
+        "codes": [
+            {
+                "data": res["data"].strip(),
+                "type": res["type"],
+                "stage": res["stage"],
+                "points": [list(pt) for pt in res["points"]],
+            }
+            for res in outcome.results
+        ],
+        "width": frame.shape[1],
+        "height": frame.shape[0],
+        "decode_ms": round((time.perf_counter() - start) * 1000, 2),
+        "stage_ms": outcome.timings,
+    }
+
+
+class FrameDecoder:
+    """Bounded process pool plus per-client and global admission limits."""
+
+    def __init__(self, workers: int = DECODE_WORKERS, max_pending: int = MAX_PENDING_FRAMES,
+                 max_client_requests: int = MAX_CLIENT_REQUESTS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_client_requests = max_client_requests
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._clients: Dict[str, int] = {}
+        self.decoded = 0
+        self.rejected = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: the server process already runs threads (journal, threadpool)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    @contextmanager
+    def admit(self, client: str):
+        """Hold one of the client's request slots for a whole upload, or raise FrameLimitExceeded.
+
+        Taken before the body is read, so a client cannot stream more uploads
+        than its limit. Yields reserve(frames), which claims pool capacity once
+        the frame count is known (and raises FrameLimitExceeded when full).
+        """
+        with self._lock:
+            if self._clients.get(client, 0) >= self.max_client_requests:
+                self.rejected += 1
+                raise FrameLimitExceeded(f"Too many concurrent frame uploads from {client}")
+            self._clients[client] = self._clients.get(client, 0) + 1
+        reserved = 0
+
+        def reserve(frames: int):
+            nonlocal reserved
+            with self._lock:
+                if self._pending + frames > self.max_pending:
+                    self.rejected += 1
+                    raise FrameLimitExceeded("Frame decoder is busy, retry shortly")
+                self._pending += frames
+                reserved += frames
+
+        try:
+            yield reserve
+        finally:
+            with self._lock:
+                self._pending -= reserved
+                self._clients[client] -= 1
+                if not self._clients[client]:
+                    del self._clients[client]
+
+    async def decode(self, images: List[bytes]) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        try:
+            results = await asyncio.gather(*(loop.run_in_executor(pool, decode_image, data) for data in images))
+        except BrokenProcessPool:
+            # A worker died (e.g. crashed in a native decoder): start a fresh pool next time
+            self.shutdown()
+            raise
+        with self._lock:
+            self.decoded += len(images)
+        return list(results)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._pool is not None,
+                "pending_frames": self._pending,
+                "active_clients": len(self._clients),
+                "decoded": self.decoded,
+                "rejected": self.rejected,
+            }
+
+
+decoder = FrameDecoder()
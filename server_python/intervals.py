@@ -0,0 +1,94 @@
+"""Per-student in/out intervals (attendance_intervals).
+
+attendance_logs keeps one row per student per event with the running total
+of closed intervals in duration_minutes and the start of the current stay in
+open_since. The triggers below turn every change of open_since into interval
+rows, so single scans, batches, the write-behind journal and journal replays
+all record the same history without reading it back; listing and export
+never touch this table.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Opening is a no-op for an interval that already exists (a replayed journal
+# state). NOT EXISTS rather than INSERT OR IGNORE: inside a trigger the outer
+# upsert's conflict policy would override OR IGNORE.
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_intervals_insert AFTER INSERT ON attendance_logs
+    WHEN NEW.open_since IS NOT NULL
+    BEGIN
+        INSERT INTO attendance_intervals (log_id, event_id, roll_no, started_at)
+        SELECT NEW.id, NEW.event_id, NEW.roll_no, NEW.open_since
+        WHERE NOT EXISTS (
+            SELECT 1 FROM attendance_intervals WHERE log_id = NEW.id AND started_at = NEW.open_since
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_intervals_close AFTER UPDATE OF open_since ON attendance_logs
+    WHEN OLD.open_since IS NOT NULL AND OLD.open_since IS NOT NEW.open_since
+    BEGIN
+        UPDATE attendance_intervals SET
+            ended_at = NEW.check_out_time,
+            duration_minutes = round((julianday(NEW.check_out_time) - julianday(started_at)) * 86400000.0) / 60000.0
+        WHERE log_id = NEW.id AND started_at = OLD.open_since;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_intervals_open AFTER UPDATE OF open_since ON attendance_logs
+    WHEN NEW.open_since IS NOT NULL AND OLD.open_since IS NOT NEW.open_since
+    BEGIN
+        INSERT INTO attendance_intervals (log_id, event_id, roll_no, started_at)
+        SELECT NEW.id, NEW.event_id, NEW.roll_no, NEW.open_since
+        WHERE NOT EXISTS (
+            SELECT 1 FROM attendance_intervals WHERE log_id = NEW.id AND started_at = NEW.open_since
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_attendance_intervals_delete AFTER DELETE ON attendance_logs
+    BEGIN
+        DELETE FROM attendance_intervals WHERE log_id = OLD.id;
+    END
+    """,
+]
+
+# Closed intervals counted before durations were rounded to whole milliseconds
+# (attendance_store.elapsed_ms) carry julianday() float noise.
+OUTDATED_TRIGGERS = {"trg_attendance_intervals_close": "86400000"}
+ROUND_DURATIONS = """
+UPDATE attendance_intervals
+SET duration_minutes = round((julianday(ended_at) - julianday(started_at)) * 86400000.0) / 60000.0
+WHERE ended_at IS NOT NULL
+"""
+
+# Logs written before intervals existed had a single stay: check-in to check-out
+# (or still open when there is no check-out).
+BACKFILL_INTERVALS = """
+INSERT OR IGNORE INTO attendance_intervals (log_id, event_id, roll_no, started_at, ended_at, duration_minutes)
+SELECT id, event_id, roll_no, check_in_time, check_out_time,
+       CASE WHEN check_out_time IS NOT NULL THEN duration_minutes END
+FROM attendance_logs
+WHERE check_in_time IS NOT NULL
+"""
+
+
+def replace_outdated_triggers(conn: Connection) -> bool:
+    """Drop interval triggers installed from an older definition (CREATE ... IF NOT
+    EXISTS never replaces them) and fix the durations they wrote."""
+    dropped = False
+    for name, marker in OUTDATED_TRIGGERS.items():
+        sql = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": name}
+        ).scalar()
+        if sql is not None and marker not in sql:
+            conn.execute(text(f"DROP TRIGGER {name}"))
+            dropped = True
+    if dropped:
+        conn.execute(text(ROUND_DURATIONS))
+    return dropped
+
+
+def backfill_intervals(conn: Connection) -> int:
+    return conn.execute(text(BACKFILL_INTERVALS)).rowcount
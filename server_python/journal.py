@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from . import models, database, live
+from .cache import CachedEvent, CachedStudent
+from .scan_logic import LogState, decide_scan
+from .attendance_store import write_log_states
+
+# Write-behind mode (opt-in): scans are decided against in-memory per-event
+# state, appended to a local journal and committed to SQLite in groups by a
+# background writer instead of one fsync per scan.
+WRITE_BEHIND = os.environ.get("ATTENDANCE_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+JOURNAL_PATH = os.environ.get("ATTENDANCE_JOURNAL_PATH", "./attendance.journal")
+FLUSH_INTERVAL_MS = int(os.environ.get("ATTENDANCE_JOURNAL_FLUSH_MS", "250"))
+
+
+class AttendanceJournal:
+    """Append-only scan journal with a grouped background writer.
+
+    Every journal line carries the full resulting log state, so replaying a
+    line twice is harmless: the journal is only truncated once everything
+    in it has been committed.
+    """
+
+    def __init__(self, path: str, session_factory=None, flush_interval: float = 0.25):
+        self.path = path
+        self.session_factory = session_factory or database.SessionLocal
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()           # state, pending list and journal file
+        self._flush_lock = threading.Lock()     # one writer transaction at a time
+        self._events: Dict[int, Dict[str, LogState]] = {}
+        self._pending: List[dict] = []
+        self._closed: Set[int] = set()         # events being finalized / deleted
+        self._file = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.flushed_records = 0
+
+    # --- Lifecycle ---
+
+    def start(self):
+        replayed = self.replay()
+        if replayed:
+            print(f"📒 Replayed {replayed} journaled scans into attendance_logs")
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="attendance-journal", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Journal flush failed, will retry: {e}")
+
+    # --- Scan path ---
+
+    def scan(self, db: Session, event: CachedEvent, student: CachedStudent, roll_no: str, now: datetime) -> dict:
+        event_state = self._event_state(db, event.id)
+        with self._lock:
+            if event.id in self._closed:
+                # Passed the cache check just before finalize/delete closed the event
+                raise HTTPException(status_code=400, detail="Event is no longer active")
+            result, state = decide_scan(event_state.get(roll_no), event, student, roll_no, now)
+            if state is not None:
+                event_state[roll_no] = state
+                record = {"event_id": event.id, "roll_no": roll_no, **state._asdict()}
+                self._file.write(json.dumps(record) + "\n")
+                self._file.flush()
+                self._pending.append(record)
+        return result
+
+    def _event_state(self, db: Session, event_id: int) -> Dict[str, LogState]:
+        with self._lock:
+            state = self._events.get(event_id)
+        if state is not None:
+            return state
+
+        rows = db.query(models.AttendanceLog).filter(models.AttendanceLog.event_id == event_id).all()
+        loaded = {
+            r.roll_no: LogState(r.check_in_time, r.check_out_time, r.duration_minutes, r.status, r.open_since)
+            for r in rows
+        }
+        with self._lock:
+            if event_id in self._closed:
+                # Loaded across a finalize/delete: do not keep pre-commit state
+                raise HTTPException(status_code=400, detail="Event is no longer active")
+            # Another request may have loaded (and already updated) it meanwhile
+            return self._events.setdefault(event_id, loaded)
+
+    def sync_event(self, event_id: int):
+        """Commit pending scans, drop the in-memory state of one event and
+        refuse further scans of it until release_event(event_id).
+
+        Called before routes that rewrite an event's logs directly
+        (finalize, delete) so the writer cannot resurrect stale rows.
+        """
+        with self._lock:
+            self._closed.add(event_id)
+        self.flush()
+        with self._lock:
+            self._events.pop(event_id, None)
+
+    def release_event(self, event_id: int):
+        with self._lock:
+            self._closed.discard(event_id)
+
+    # --- Writer ---
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                self._apply(batch)
+            except Exception:
+                with self._lock:
+                    self._pending = batch + self._pending
+                raise
+            with self._lock:
+                if not self._pending and self._file:
+                    self._file.truncate(0)
+                self.flushes += 1
+                self.flushed_records += len(batch)
+            return len(batch)
+
+    def _apply(self, records: List[dict]):
+        # Every state in journal order, not just the latest per student: the
+        # interval triggers need each open/close transition
+        db = self.session_factory()
+        try:
+            write_log_states(db, [
+                (record["event_id"], record["roll_no"], record_state(record)) for record in records
+            ])
+            db.commit()
+            for event_id in {record["event_id"] for record in records}:
+                live.publish_stats(db, event_id)
+        finally:
+            db.close()
+
+    def replay(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-append
+                    continue
+        if records:
+            self._apply(records)
+        open(self.path, "w").close()
+        return len(records)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "flushes": self.flushes,
+                "flushed_records": self.flushed_records,
+                "events_in_memory": len(self._events),
+            }
+
+
+def record_state(record: dict) -> LogState:
+    # Lines journaled before open_since existed: no check-out means still inside
+    open_since = record.get("open_since", record["check_in_time"] if record["check_out_time"] is None else None)
+    return LogState(
+        record["check_in_time"], record["check_out_time"], record["duration_minutes"], record["status"], open_since
+    )
+
+
+# Set on startup when write-behind mode is enabled; routes check it per call
+active: Optional[AttendanceJournal] = None
+
+
+def start():
+    global active
+    if WRITE_BEHIND and active is None:
+        active = AttendanceJournal(JOURNAL_PATH, flush_interval=FLUSH_INTERVAL_MS / 1000.0).start()
+    return active
+
+
+def stop():
+    global active
+    if active is not None:
+        active.stop()
+        active = None
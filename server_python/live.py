@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from . import models
+
+HISTORY_SIZE = 1000          # deltas kept per event for reconnecting clients
+SUBSCRIBER_QUEUE_SIZE = 500  # a client further behind than this is told to reload
+
+RESET = object()
+
+
+class _Channel:
+    def __init__(self):
+        self.seq = 0
+        self.history: Deque[Tuple[int, str]] = deque(maxlen=HISTORY_SIZE)
+        self.subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+
+
+class LiveBroker:
+    """In-process fan-out of attendance deltas to SSE subscribers.
+
+    publish() may be called from any thread (the sync routes run in the
+    threadpool). Each delta is serialized once and handed to every
+    subscriber queue on its event loop, so subscribers never touch the DB.
+    Delta ids are "<epoch>-<seq>": a cursor from before a restart (another
+    epoch) or older than the history window gets a reset instead.
+    """
+
+    def __init__(self):
+        self.epoch = str(int(time.time()))
+        self._lock = threading.Lock()
+        self._channels: Dict[int, _Channel] = {}
+        self.published = 0
+
+    def _channel(self, event_id: int) -> _Channel:
+        channel = self._channels.get(event_id)
+        if channel is None:
+            channel = self._channels[event_id] = _Channel()
+        return channel
+
+    def publish(self, event_id: int, kind: str, data: dict):
+        with self._lock:
+            channel = self._channel(event_id)
+            channel.seq += 1
+            frame = f"id: {self.epoch}-{channel.seq}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+            channel.history.append((channel.seq, frame))
+            subscribers = list(channel.subscribers.items())
+            self.published += 1
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, frame)
+
+    def subscribe(self, event_id: int, cursor: Optional[str]) -> Tuple[asyncio.Queue, List[str], bool]:
+        """Register a subscriber; returns its queue, missed frames and whether it must reload."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            channel = self._channel(event_id)
+            channel.subscribers[queue] = loop
+            backlog, reset = self._backlog(channel, cursor)
+        return queue, backlog, reset
+
+    def _backlog(self, channel: _Channel, cursor: Optional[str]) -> Tuple[List[str], bool]:
+        if not cursor:
+            return [], False
+        epoch, _, seq = cursor.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return [], True
+        seq = int(seq)
+        oldest = channel.history[0][0] if channel.history else channel.seq + 1
+        if seq > channel.seq or seq < oldest - 1:
+            return [], True
+        return [frame for s, frame in channel.history if s > seq], False
+
+    def unsubscribe(self, event_id: int, queue: asyncio.Queue):
+        with self._lock:
+            channel = self._channels.get(event_id)
+            if channel:
+                channel.subscribers.pop(queue, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "published": self.published,
+                "channels": len(self._channels),
+                "subscribers": sum(len(c.subscribers) for c in self._channels.values()),
+            }
+
+
+def _offer(queue: asyncio.Queue, frame: str):
+    try:
+        queue.put_nowait(frame)
+    except asyncio.QueueFull:
+        # Slow client: drop its backlog and make it reload once
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESET)
+
+
+broker = LiveBroker()
+
+
+def publish_scan(event_id: int, result: dict):
+    """Publish a scan response that changed attendance (CHECK_IN / CHECK_OUT)."""
+    if result.get("action") not in ("CHECK_IN", "CHECK_OUT"):
+        return
+    delta = {
+        key: result.get(key)
+        for key in ("action", "roll_no", "student_name", "check_in_time", "check_out_time", "duration_minutes", "status", "open_since")
+    }
+    delta["status"] = delta["status"] or "PENDING"
+    broker.publish(event_id, "scan", delta)
+
+
+def publish_stats(db: Session, event_id: int):
+    """Publish the committed event_counters row: one read shared by every subscriber."""
+    counters = db.get(models.EventCounter, event_id)
+    broker.publish(event_id, "stats", {
+        "event_id": event_id,
+        "total_scans": counters.total if counters else 0,
+        "present": counters.present if counters else 0,
+        "absent": counters.absent if counters else 0,
+        "pending": counters.pending if counters else 0,
+        "version": counters.version if counters else 0,
+    })
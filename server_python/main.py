@@ -1,17 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
+from fastapi.responses import PlainTextResponse
+from .database import engine, read_engine, Base
+from .migrations import run_migrations
 from .routes import scan, students, events, auth, attendance
 from fastapi import Depends
 from sqlalchemy.orm import Session
-from . import database
+from . import database, journal, db_workers, audit
+from .frame_decoder import decoder as frame_decoder
+from .metrics import MetricsMiddleware, instrument_engine, metrics
 
 # ...
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+instrument_engine(engine, metrics)
+if read_engine is not engine:
+    instrument_engine(read_engine, metrics)
 
-app = FastAPI(title="Event Attendance System")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Write-behind journal (ATTENDANCE_WRITE_BEHIND=1): replay, then start the writer
+    journal.start()
+    yield
+    frame_decoder.shutdown()
+    db_workers.writer.stop()
+    db_workers.reader.shutdown()
+    journal.stop()
+    # After the scan paths stop, so the last attempts reach the table
+    audit.log.stop()
+
+app = FastAPI(title="Event Attendance System", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,7 +40,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+# Outermost, so latency includes CORS and every other middleware
+app.add_middleware(MetricsMiddleware, metrics=metrics)
 
 app.include_router(scan.router, prefix="/api/scan", tags=["scan"])
 app.include_router(students.router, prefix="/api/students", tags=["students"])
@@ -36,12 +60,20 @@ def health_check():
     }
 
 @app.get("/api/health/full")
-def full_health_check(db: Session = Depends(database.get_db)):
+def full_health_check(db: Session = Depends(database.get_read_db)):
     try:
         from sqlalchemy import text
         # Check DB connection
         db.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected", "components": ["vision", "api", "db"]}
+        return {
+            "status": "healthy", "database": "connected", "components": ["vision", "api", "db"],
+            "metrics": metrics.summary(),
+        }
     except Exception as e:
         print(f"Health Check Failed: {e}")
-        return {"status": "unhealthy", "error": str(e)}
+        return {"status": "unhealthy", "error": str(e), "metrics": metrics.summary()}
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text exposition format; scrape with metrics_path: /api/metrics
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
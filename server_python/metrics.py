@@ -0,0 +1,270 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event as sa_event
+
+# Request and query instrumentation, exported in Prometheus text format at
+# /api/metrics and summarized in /api/health/full. Everything is kept in
+# process memory behind one lock: a request costs a few dict updates, a
+# query two perf_counter() calls.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BACKGROUND = "background"  # queries outside a request (journal writer, startup)
+UNMATCHED = "unmatched"    # 404s are not labelled by raw path, which is unbounded
+
+_request_db: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar("request_db", default=None)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # last slot: +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (like histogram_quantile, without interpolation)."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return LATENCY_BUCKETS[-1]
+
+
+class _RouteStats:
+    __slots__ = ("latency", "statuses", "queries", "db_seconds")
+
+    def __init__(self):
+        self.latency = _Histogram()
+        self.statuses: Dict[int, int] = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+class Metrics:
+    """Per-route latency histograms, status counts, in-flight requests and DB time.
+
+    DB time is attributed to the request through a context variable holding
+    a [queries, seconds] accumulator; the sync routes run in the threadpool,
+    and the async routes' jobs on the db_workers reader and writer threads,
+    with a copy of the request context, so their queries land in the same
+    accumulator.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], _RouteStats] = {}
+        self._background = [0, 0.0]
+        self.in_flight = 0
+        self.started = time.time()
+
+    def _route(self, method: str, route: str) -> _RouteStats:
+        key = (method, route)
+        stats = self._routes.get(key)
+        if stats is None:
+            stats = self._routes[key] = _RouteStats()
+        return stats
+
+    # --- Recording ---
+
+    def request_started(self) -> List[float]:
+        accumulator = [0, 0.0]
+        _request_db.set(accumulator)
+        with self._lock:
+            self.in_flight += 1
+        return accumulator
+
+    def request_finished(self, method: str, route: str, status: int, seconds: Optional[float], db: List[float]):
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._route(method, route)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if seconds is not None:
+                stats.latency.observe(seconds)
+            stats.queries += db[0]
+            stats.db_seconds += db[1]
+
+    def record_query(self, seconds: float):
+        accumulator = _request_db.get()
+        if accumulator is None:
+            with self._lock:
+                accumulator = self._background
+                accumulator[0] += 1
+                accumulator[1] += seconds
+            return
+        # Only the request's own thread(s) touch its accumulator
+        accumulator[0] += 1
+        accumulator[1] += seconds
+
+    # --- Export ---
+
+    def prometheus(self) -> str:
+        with self._lock:
+            routes = sorted(self._routes.items())
+            in_flight = self.in_flight
+            background = list(self._background)
+            snapshot = [
+                (method, route, list(s.latency.counts), s.latency.total, s.latency.count,
+                 sorted(s.statuses.items()), s.queries, s.db_seconds)
+                for (method, route), s in routes
+            ]
+
+        lines = [
+            "# HELP attendance_http_requests_in_flight Requests currently being served.",
+            "# TYPE attendance_http_requests_in_flight gauge",
+            f"attendance_http_requests_in_flight {in_flight}",
+            "# HELP attendance_http_request_duration_seconds Request latency by route (streaming responses excluded).",
+            "# TYPE attendance_http_request_duration_seconds histogram",
+        ]
+        for method, route, counts, total, count, _, _, _ in snapshot:
+            if not count:
+                continue  # streaming-only route
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, counts):
+                cumulative += n
+                lines.append(f'attendance_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'attendance_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"attendance_http_request_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"attendance_http_request_duration_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP attendance_http_responses_total Responses by route and status code.",
+            "# TYPE attendance_http_responses_total counter",
+        ]
+        for method, route, _, _, _, statuses, _, _ in snapshot:
+            for status, n in statuses:
+                lines.append(f'attendance_http_responses_total{{method="{method}",route="{route}",status="{status}"}} {n}')
+
+        lines += [
+            "# HELP attendance_db_queries_total SQL statements executed, by route.",
+            "# TYPE attendance_db_queries_total counter",
+        ]
+        for method, route, _, _, _, _, queries, _ in snapshot:
+            lines.append(f'attendance_db_queries_total{{method="{method}",route="{route}"}} {queries}')
+        lines.append(f'attendance_db_queries_total{{method="",route="{BACKGROUND}"}} {background[0]}')
+
+        lines += [
+            "# HELP attendance_db_seconds_total Time spent executing SQL, by route.",
+            "# TYPE attendance_db_seconds_total counter",
+        ]
+        for method, route, _, _, _, _, _, db_seconds in snapshot:
+            lines.append(f'attendance_db_seconds_total{{method="{method}",route="{route}"}} {db_seconds:.6f}')
+        lines.append(f'attendance_db_seconds_total{{method="",route="{BACKGROUND}"}} {background[1]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        with self._lock:
+            routes = {}
+            requests = errors = 0
+            for (method, route), s in sorted(self._routes.items()):
+                served = sum(s.statuses.values())
+                failed = sum(n for status, n in s.statuses.items() if status >= 500)
+                requests += served
+                errors += failed
+                timed = s.latency.count
+                routes[f"{method} {route}"] = {
+                    "requests": served,
+                    "errors": failed,
+                    "avg_ms": round(s.latency.total / timed * 1000, 2) if timed else None,
+                    "p95_ms": round(s.latency.quantile(0.95) * 1000, 1) if timed else None,
+                    "queries_per_request": round(s.queries / served, 2) if served else 0,
+                    "db_ms_per_request": round(s.db_seconds / served * 1000, 2) if served else 0,
+                }
+            return {
+                "uptime_seconds": round(time.time() - self.started),
+                "in_flight": self.in_flight,
+                "requests": requests,
+                "server_errors": errors,
+                "background_queries": self._background[0],
+                "routes": routes,
+            }
+
+
+def route_template(scope) -> str:
+    """"/api/events/{event_id}/stats" for a matched request, whatever the router nesting.
+
+    Included routers keep their routes' own paths ("/{event_id}/stats"), so
+    the prefix is taken from the request path: everything before the
+    route's own segments (path params never contain "/"). scope["path"]
+    already includes any root_path or mount prefix.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED
+    path = scope["path"]
+    depth = template.count("/")
+    prefix = "/".join(path.split("/")[:-depth]) if depth else path
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware), so SSE streams pass through untouched.
+
+    Latency runs until the last body chunk; event-stream responses only count
+    toward status codes, since their duration is the client's session length.
+    The response also carries a Server-Timing header with app and DB time, so
+    a slow gate can tell server time from network and queuing on its side.
+    """
+
+    def __init__(self, app, metrics: "Metrics"):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        db = self.metrics.request_started()
+        response = {"status": 500, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = message.get("headers") or []
+                response["streaming"] = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream") for name, value in headers
+                )
+                timing = f"app;dur={(time.perf_counter() - start) * 1000:.1f}, db;dur={db[1] * 1000:.1f}"
+                message["headers"] = [*headers, (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.request_finished(
+                scope["method"],
+                route_template(scope),
+                response["status"],
+                None if response["streaming"] else time.perf_counter() - start,
+                db,
+            )
+
+
+def instrument_engine(engine, metrics: "Metrics"):
+    """Count statements and their execution time on every connection of engine."""
+
+    @sa_event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["metrics_query_start"] = time.perf_counter()
+
+    @sa_event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("metrics_query_start", None)
+        if start is not None:
+            metrics.record_query(time.perf_counter() - start)
+
+
+metrics = Metrics()
@@ -0,0 +1,141 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from .counters import TRIGGERS, rebuild_counters
+from . import intervals
+
+# Idempotent DDL applied on startup for databases created before the
+# corresponding model changes (create_all never alters existing tables).
+STATEMENTS = [
+    # Case-insensitive roll number lookups (scan cache misses) without a table scan
+    "CREATE INDEX IF NOT EXISTS ix_students_roll_no_upper ON students (upper(roll_no))",
+    # One log per student per event (see merge_duplicate_logs)
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_attendance_logs_event_roll ON attendance_logs (event_id, roll_no)",
+    # Per-status filters within an event (finalize, counter rebuilds)
+    "CREATE INDEX IF NOT EXISTS ix_attendance_logs_event_status ON attendance_logs (event_id, status)",
+]
+
+# Keep the most complete log of each (event_id, roll_no) group: PRESENT over
+# ABSENT over PENDING, then the latest check-out, then the oldest row.
+MERGE_DUPLICATE_LOGS = """
+DELETE FROM attendance_logs WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY event_id, roll_no
+            ORDER BY CASE status WHEN 'PRESENT' THEN 0 WHEN 'ABSENT' THEN 1 ELSE 2 END,
+                     check_out_time IS NULL,
+                     check_out_time DESC,
+                     id
+        ) AS rn
+        FROM attendance_logs
+    ) WHERE rn > 1
+)
+"""
+
+
+# Full-text index over roll_no, name and department for /api/students?search=
+# (external content table: rows live in students, kept in sync by triggers)
+STUDENT_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5("
+    "roll_no, name, department, content='students', content_rowid='id', prefix='2 3')"
+)
+STUDENT_SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_students_fts_insert AFTER INSERT ON students
+    BEGIN
+        INSERT INTO students_fts (rowid, roll_no, name, department)
+        VALUES (NEW.id, NEW.roll_no, NEW.name, NEW.department);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_students_fts_delete AFTER DELETE ON students
+    BEGIN
+        INSERT INTO students_fts (students_fts, rowid, roll_no, name, department)
+        VALUES ('delete', OLD.id, OLD.roll_no, OLD.name, OLD.department);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_students_fts_update AFTER UPDATE ON students
+    BEGIN
+        INSERT INTO students_fts (students_fts, rowid, roll_no, name, department)
+        VALUES ('delete', OLD.id, OLD.roll_no, OLD.name, OLD.department);
+        INSERT INTO students_fts (rowid, roll_no, name, department)
+        VALUES (NEW.id, NEW.roll_no, NEW.name, NEW.department);
+    END
+    """,
+]
+
+
+def table_exists(conn: Connection, name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+    ).first() is not None
+
+
+def create_student_search(conn: Connection):
+    """Create and backfill students_fts; skipped when SQLite lacks FTS5."""
+    if table_exists(conn, "students_fts"):
+        return
+    try:
+        conn.execute(text(STUDENT_SEARCH_TABLE))
+    except OperationalError:
+        print("⚠️ SQLite was built without FTS5; student search falls back to LIKE")
+        return
+    for trigger in STUDENT_SEARCH_TRIGGERS:
+        conn.execute(text(trigger))
+    conn.execute(text("INSERT INTO students_fts (students_fts) VALUES ('rebuild')"))
+
+
+def index_exists(conn: Connection, name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"), {"name": name}
+    ).first() is not None
+
+
+def merge_duplicate_logs(conn: Connection) -> int:
+    return conn.execute(text(MERGE_DUPLICATE_LOGS)).rowcount
+
+
+def trigger_exists(conn: Connection, name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": name}
+    ).first() is not None
+
+
+def column_exists(conn: Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(text(f"PRAGMA table_info({table})")))
+
+
+def add_open_since(conn: Connection):
+    """Add attendance_logs.open_since; logs without a check-out are still inside."""
+    conn.execute(text("ALTER TABLE attendance_logs ADD COLUMN open_since VARCHAR"))
+    conn.execute(text("UPDATE attendance_logs SET open_since = check_in_time WHERE check_out_time IS NULL"))
+
+
+def run_migrations(engine: Engine):
+    with engine.begin() as conn:
+        if not column_exists(conn, "attendance_logs", "open_since"):
+            add_open_since(conn)
+        if not index_exists(conn, "ux_attendance_logs_event_roll"):
+            merged = merge_duplicate_logs(conn)
+            if merged:
+                print(f"🧹 Merged {merged} duplicate attendance logs before adding the unique index")
+        for statement in STATEMENTS:
+            conn.execute(text(statement))
+
+        # Counters start from the existing logs the first time the triggers are installed
+        counters_new = not trigger_exists(conn, "trg_attendance_counters_insert")
+        for trigger in TRIGGERS:
+            conn.execute(text(trigger))
+        if counters_new:
+            rebuild_counters(conn)
+
+        # Existing logs become one interval each the first time the triggers are installed
+        intervals_new = not trigger_exists(conn, "trg_attendance_intervals_insert")
+        intervals.replace_outdated_triggers(conn)
+        for trigger in intervals.TRIGGERS:
+            conn.execute(text(trigger))
+        if intervals_new:
+            intervals.backfill_intervals(conn)
+
+        create_student_search(conn)
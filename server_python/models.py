@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -39,14 +39,66 @@ class Event(Base):
 
 class AttendanceLog(Base):
     __tablename__ = "attendance_logs"
+    __table_args__ = (
+        # One log per student per event; the scan upsert conflicts on this
+        Index("ux_attendance_logs_event_roll", "event_id", "roll_no", unique=True),
+        # Per-status filters within an event (finalize, counter rebuilds, status listings)
+        Index("ix_attendance_logs_event_status", "event_id", "status"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     roll_no = Column(String, ForeignKey("students.roll_no"))
     event_id = Column(Integer, ForeignKey("events.id"))
-    check_in_time = Column(String) # ISO format
-    check_out_time = Column(String, nullable=True) # ISO format
-    duration_minutes = Column(Float, nullable=True)
+    check_in_time = Column(String) # ISO format, first entry
+    check_out_time = Column(String, nullable=True) # ISO format, latest exit
+    duration_minutes = Column(Float, nullable=True) # Sum of closed intervals
     status = Column(String, default="PENDING") # PENDING, PRESENT, ABSENT
+    open_since = Column(String, nullable=True) # Start of the current interval; NULL while out
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     student = relationship("Student", back_populates="attendance_logs")
     event = relationship("Event", back_populates="attendance_logs")
+
+class AttendanceInterval(Base):
+    """One in/out stay of a student at an event, maintained by triggers on attendance_logs."""
+    __tablename__ = "attendance_intervals"
+    __table_args__ = (
+        # One interval per start; replayed journal states find it instead of adding another
+        Index("ux_attendance_intervals_log_start", "log_id", "started_at", unique=True),
+    )
+    id = Column(Integer, primary_key=True)
+    log_id = Column(Integer, ForeignKey("attendance_logs.id"))
+    event_id = Column(Integer)
+    roll_no = Column(String)
+    started_at = Column(String) # ISO format
+    ended_at = Column(String, nullable=True) # NULL while the student is inside
+    duration_minutes = Column(Float, nullable=True)
+
+class EventCounter(Base):
+    """Per-event attendance tallies, maintained by triggers on attendance_logs."""
+    __tablename__ = "event_counters"
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True)
+    total = Column(Integer, nullable=False, server_default="0")
+    present = Column(Integer, nullable=False, server_default="0")
+    absent = Column(Integer, nullable=False, server_default="0")
+    pending = Column(Integer, nullable=False, server_default="0")
+    version = Column(Integer, nullable=False, server_default="0")
+
+class ScanAuditLog(Base):
+    """Append-only record of every scan attempt, written in batches by audit.py."""
+    __tablename__ = "scan_audit_log"
+    __table_args__ = (
+        # Per-event keyset paging (GET /api/scan/audit)
+        Index("ix_scan_audit_log_event_id", "event_id", "id"),
+    )
+    id = Column(Integer, primary_key=True)
+    event_id = Column(Integer)
+    kiosk_id = Column(String, nullable=True)
+    source = Column(String)                           # scan, batch, frame
+    raw_payload = Column(String)                      # as sent / decoded, before normalization
+    roll_no = Column(String)                          # normalized
+    outcome = Column(String)                          # CHECK_IN, DUPLICATE_BLOCKED, UNKNOWN_ROLL_NO, ...
+    status_code = Column(Integer)
+    detail = Column(String, nullable=True)
+    scanned_at = Column(String, nullable=True)        # client capture time (ISO)
+    received_at = Column(String)                      # server time (ISO)
+    latency_ms = Column(Float)
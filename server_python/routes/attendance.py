@@ -1,57 +1,103 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from fastapi.responses import StreamingResponse
+from typing import List
 import csv
 import io
-from .. import models, database
+from .. import models, schemas, database
+from ..cache import normalize_roll_no
+from ..db_workers import reader
 
 router = APIRouter()
 
+EXPORT_CHUNK_ROWS = 500
+
+def attendance_rows_query(db: Session, event_id: int):
+    # Single LEFT JOIN instead of one Student lookup per log
+    return db.query(
+        models.AttendanceLog.roll_no,
+        models.Student.name,
+        models.AttendanceLog.check_in_time,
+        models.AttendanceLog.check_out_time,
+        models.AttendanceLog.duration_minutes,
+        models.AttendanceLog.status
+    ).outerjoin(
+        models.Student, models.Student.roll_no == models.AttendanceLog.roll_no
+    ).filter(models.AttendanceLog.event_id == event_id)
+
 @router.get("/event/{event_id}")
-def get_event_attendance(event_id: int, db: Session = Depends(database.get_db)):
-    logs = db.query(models.AttendanceLog).filter(models.AttendanceLog.event_id == event_id).all()
-    # Join with student info
-    results = []
-    for log in logs:
-        student = db.query(models.Student).filter(models.Student.roll_no == log.roll_no).first()
-        results.append({
-            "roll_no": log.roll_no,
-            "student_name": student.name if student else "Unknown",
-            "check_in_time": log.check_in_time,
-            "check_out_time": log.check_out_time,
-            "duration_minutes": log.duration_minutes,
-            "status": log.status
-        })
-    return results
+async def get_event_attendance(event_id: int):
+    return await reader.run(attendance_rows, event_id)
+
+def attendance_rows(db: Session, event_id: int) -> list:
+    return [
+        {
+            "roll_no": row.roll_no,
+            "student_name": row.name or "Unknown",
+            "check_in_time": row.check_in_time,
+            "check_out_time": row.check_out_time,
+            "duration_minutes": row.duration_minutes,
+            "status": row.status
+        }
+        for row in attendance_rows_query(db, event_id)
+    ]
+
+@router.get("/event/{event_id}/student/{roll_no}/intervals", response_model=List[schemas.AttendanceIntervalResponse])
+def get_student_intervals(event_id: int, roll_no: str, db: Session = Depends(database.get_read_db)):
+    """Every in/out stay of one student; the last one is open while they are inside."""
+    log_id = db.query(models.AttendanceLog.id).filter(
+        models.AttendanceLog.event_id == event_id,
+        models.AttendanceLog.roll_no == normalize_roll_no(roll_no)
+    ).scalar()
+    if log_id is None:
+        raise HTTPException(status_code=404, detail="No attendance for this student at this event")
+    return db.query(models.AttendanceInterval).filter(
+        models.AttendanceInterval.log_id == log_id
+    ).order_by(models.AttendanceInterval.started_at).all()
+
+def iter_attendance_csv(event_id: int):
+    """Yield the CSV a few hundred rows at a time from a server-side cursor.
+
+    Uses its own session: the request's session is closed once the route
+    returns, while this generator keeps running until the body is sent.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # Header
+    writer.writerow(["Roll No", "Student Name", "Check In", "Check Out", "Duration (Mins)", "Status"])
+    # Sent before the query runs, so the download starts immediately
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+
+    db = database.ReadSessionLocal()
+    try:
+        rows = attendance_rows_query(db, event_id).yield_per(EXPORT_CHUNK_ROWS)
+        for i, row in enumerate(rows, start=1):
+            writer.writerow([
+                row.roll_no,
+                row.name or "Unknown",
+                row.check_in_time,
+                row.check_out_time,
+                f"{row.duration_minutes:.2f}" if row.duration_minutes else "0",
+                row.status
+            ])
+            if i % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+    finally:
+        db.close()
+
+    yield buffer.getvalue()
 
 @router.get("/event/{event_id}/export")
-def export_event_attendance(event_id: int, db: Session = Depends(database.get_db)):
+def export_event_attendance(event_id: int, db: Session = Depends(database.get_read_db)):
     event = db.query(models.Event).filter(models.Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
-        
-    logs = db.query(models.AttendanceLog).filter(models.AttendanceLog.event_id == event_id).all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow(["Roll No", "Student Name", "Check In", "Check Out", "Duration (Mins)", "Status"])
-    
-    for log in logs:
-        student = db.query(models.Student).filter(models.Student.roll_no == log.roll_no).first()
-        writer.writerow([
-            log.roll_no,
-            student.name if student else "Unknown",
-            log.check_in_time,
-            log.check_out_time,
-            f"{log.duration_minutes:.2f}" if log.duration_minutes else "0",
-            log.status
-        ])
-    
-    output.seek(0)
-    
-    response = StreamingResponse(iter([output.getvalue()]), media_type="text/csv")
+
+    response = StreamingResponse(iter_attendance_csv(event_id), media_type="text/csv")
     response.headers["Content-Disposition"] = f"attachment; filename=attendance_{event_id}.csv"
     return response
@@ -20,7 +20,7 @@ ALGORITHM = "HS256"
 router = APIRouter()
 
 @router.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest, db: Session = Depends(database.get_db)):
+def login(request: LoginRequest, db: Session = Depends(database.get_read_db)):
     # Find user
     admin = db.query(models.Admin).filter(models.Admin.username == request.username).first()
     if not admin:
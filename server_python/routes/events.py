@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas, database
+from typing import List, Optional
+from .. import models, schemas, database, journal, live
+from ..cache import roster_cache
+from ..db_workers import reader
+import asyncio
 import uuid
 
 router = APIRouter()
 
+STREAM_KEEPALIVE_SECONDS = 15
+
 @router.post("/", response_model=schemas.EventResponse)
 def create_event(event: schemas.EventCreate, db: Session = Depends(database.get_db)):
     # session_token = str(uuid.uuid4())
@@ -22,67 +28,138 @@ def create_event(event: schemas.EventCreate, db: Session = Depends(database.get_
     db.add(new_event)
     db.commit()
     db.refresh(new_event)
+    roster_cache.invalidate_event(new_event.id)
     return new_event
 
 @router.get("/", response_model=List[schemas.EventResponse])
-def list_events(db: Session = Depends(database.get_db)):
+def list_events(db: Session = Depends(database.get_read_db)):
     return db.query(models.Event).all()
 
 @router.get("/{event_id}")
-def get_event(event_id: int, db: Session = Depends(database.get_db)):
+def get_event(event_id: int, db: Session = Depends(database.get_read_db)):
     event = db.query(models.Event).filter(models.Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
 
+def read_event_counters(db: Session, event_id: int):
+    # Trigger-maintained tallies: one primary-key read instead of four COUNTs
+    return roster_cache.get_event(db, event_id), db.get(models.EventCounter, event_id)
+
 @router.get("/{event_id}/stats")
-def get_event_stats(event_id: int, db: Session = Depends(database.get_db)):
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
+async def get_event_stats(event_id: int, request: Request, response: Response):
+    event, counters = await reader.run(read_event_counters, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    total = db.query(models.AttendanceLog).filter(models.AttendanceLog.event_id == event_id).count()
-    present = db.query(models.AttendanceLog).filter(models.AttendanceLog.event_id == event_id, models.AttendanceLog.status == "PRESENT").count()
-    absent = db.query(models.AttendanceLog).filter(models.AttendanceLog.event_id == event_id, models.AttendanceLog.status == "ABSENT").count()
-    pending = db.query(models.AttendanceLog).filter(models.AttendanceLog.event_id == event_id, models.AttendanceLog.status == "PENDING").count()
+    version = counters.version if counters else 0
+
+    # Pollers revalidate with If-None-Match and get a bodiless 304 while nothing changed
+    etag = f'W/"{event_id}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
 
     return {
         "event_id": event.id,
         "title": event.title,
-        "total_scans": total,
-        "present": present,
-        "absent": absent,
-        "pending": pending
+        "total_scans": counters.total if counters else 0,
+        "present": counters.present if counters else 0,
+        "absent": counters.absent if counters else 0,
+        "pending": counters.pending if counters else 0,
+        "version": version
     }
 
+@router.get("/{event_id}/stream")
+async def stream_event(event_id: int, request: Request, cursor: Optional[str] = None):
+    """Server-sent events: `scan`, `stats`, `finalize`, `deleted` and `reset` deltas.
+
+    Reconnects resume after the Last-Event-ID header (sent automatically by
+    EventSource) or ?cursor=; `reset` means the client must reload in full.
+    """
+    if not await reader.run(_event_exists, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+    cursor = request.headers.get("last-event-id") or cursor
+
+    async def frames():
+        queue, backlog, reset = live.broker.subscribe(event_id, cursor)
+        try:
+            if reset:
+                yield "event: reset\ndata: {}\n\n"
+            for frame in backlog:
+                yield frame
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield "event: reset\ndata: {}\n\n" if frame is live.RESET else frame
+        finally:
+            live.broker.unsubscribe(event_id, queue)
+
+    return StreamingResponse(frames(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+def _event_exists(db: Session, event_id: int) -> bool:
+    return roster_cache.get_event(db, event_id) is not None
+
 @router.post("/{event_id}/finalize")
 def finalize_event(event_id: int, db: Session = Depends(database.get_db)):
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Update pending to absent
-    rows = db.query(models.AttendanceLog).filter(
-        models.AttendanceLog.event_id == event_id, 
-        models.AttendanceLog.status == 'PENDING'
-    ).update({models.AttendanceLog.status: 'ABSENT'}, synchronize_session=False)
-    
-    event.is_active = False
-    db.commit()
+    # Scans see the event as closed from here until the cache is refreshed below
+    roster_cache.close_event(event_id)
+    try:
+        # Before this session takes the writer connection: the journal flush needs it
+        if journal.active is not None:
+            journal.active.sync_event(event_id)
+        event = db.query(models.Event).filter(models.Event.id == event_id).first()
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+
+        # Update pending to absent
+        rows = db.query(models.AttendanceLog).filter(
+            models.AttendanceLog.event_id == event_id,
+            models.AttendanceLog.status == 'PENDING'
+        ).update({models.AttendanceLog.status: 'ABSENT'}, synchronize_session=False)
+
+        event.is_active = False
+        db.commit()
+    finally:
+        release_event(event_id)
+    live.broker.publish(event_id, "finalize", {"event_id": event_id, "finalized_count": rows})
+    live.publish_stats(db, event_id)
     
     return {"message": f"Finalized. {rows} records marked as ABSENT.", "finalized_count": rows}
 
 @router.delete("/{event_id}")
 def delete_event(event_id: int, db: Session = Depends(database.get_db)):
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Delete associated logs first
-    db.query(models.AttendanceLog).filter(models.AttendanceLog.event_id == event_id).delete()
-    
-    # Delete the event
-    db.delete(event)
-    db.commit()
+    roster_cache.close_event(event_id)
+    try:
+        if journal.active is not None:
+            journal.active.sync_event(event_id)
+        event = db.query(models.Event).filter(models.Event.id == event_id).first()
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+
+        # Delete associated logs first
+        db.query(models.AttendanceLog).filter(models.AttendanceLog.event_id == event_id).delete()
+
+        # Delete the event
+        db.delete(event)
+        db.commit()
+    finally:
+        release_event(event_id)
+    live.broker.publish(event_id, "deleted", {"event_id": event_id})
     
     return {"message": "Event and associated attendance logs deleted successfully"}
+
+def release_event(event_id: int):
+    """After finalize/delete: scans read the committed event (inactive or gone) again."""
+    roster_cache.invalidate_event(event_id)
+    if journal.active is not None:
+        journal.active.release_event(event_id)
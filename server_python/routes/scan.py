@@ -1,127 +1,325 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from datetime import datetime
-from .. import models, schemas, database
+from datetime import datetime, timedelta
+import os
+from time import perf_counter
+from typing import List, Optional, Tuple
+from .. import models, schemas, database, journal, live, audit
+from ..db_workers import writer
+from ..frame_decoder import decoder, FrameLimitExceeded, MAX_FRAME_BYTES, MAX_FRAMES_PER_REQUEST
+from ..cache import roster_cache, normalize_roll_no
+from ..attendance_store import upsert_scan
+from ..scan_logic import COOLDOWN_SECONDS, MIN_CHECKOUT_MINUTES
 
 router = APIRouter()
 
+MAX_BATCH_SIZE = 1000
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # boundaries, part headers and form fields
+# Oldest client capture time accepted: covers kiosk spool replays after an
+# outage, rejects wrong kiosk clocks that would invent hours of attendance
+MAX_SCAN_AGE = timedelta(hours=float(os.environ.get("ATTENDANCE_MAX_SCAN_AGE_HOURS", "12")))
+
+@router.get("/cache")
+def cache_stats():
+    return roster_cache.stats()
+
+@router.get("/journal")
+def journal_stats():
+    if journal.active is None:
+        return {"write_behind": False}
+    return {"write_behind": True, **journal.active.stats()}
+
+@router.get("/roster")
+def scan_roster(event_id: int, since: int = 0, db: Session = Depends(database.get_read_db)):
+    """Roster snapshot for kiosks to reject unknown codes and repeat scans locally.
+
+    since=0 returns every student plus the event's current attendance;
+    since=<cursor> returns only students registered after that cursor
+    (student ids only grow and students are never deleted).
+    """
+    event = roster_cache.get_event(db, event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    rows = db.query(models.Student.id, models.Student.roll_no).filter(
+        models.Student.id > since
+    ).order_by(models.Student.id).all()
+
+    snapshot = {
+        "event": {
+            "id": event.id,
+            "title": event.title,
+            "is_active": event.is_active,
+            "duration_minutes": event.duration_minutes,
+            "min_attendance_percent": event.min_attendance_percent,
+            "cooldown_seconds": COOLDOWN_SECONDS,
+            "min_checkout_minutes": MIN_CHECKOUT_MINUTES,
+        },
+        "students": [normalize_roll_no(roll_no) for _, roll_no in rows],
+        "cursor": rows[-1].id if rows else since,
+        "full": since == 0,
+    }
+    if since == 0:
+        logs = db.query(
+            models.AttendanceLog.roll_no,
+            models.AttendanceLog.check_in_time,
+            models.AttendanceLog.check_out_time,
+            models.AttendanceLog.status,
+            models.AttendanceLog.open_since
+        ).filter(models.AttendanceLog.event_id == event_id)
+        snapshot["attendance"] = {
+            log.roll_no: {
+                "check_in_time": log.check_in_time, "check_out_time": log.check_out_time,
+                "status": log.status, "open_since": log.open_since,
+            }
+            for log in logs
+        }
+    return snapshot
+
+def scan_time(scanned_at: Optional[datetime]) -> datetime:
+    """Server-local naive timestamp for a scan; client timestamps are never in the future."""
+    now = datetime.now()
+    if scanned_at is None:
+        return now
+    if scanned_at.tzinfo is not None:
+        scanned_at = scanned_at.astimezone().replace(tzinfo=None)
+    return min(scanned_at, now)
+
 @router.post("/")
 @router.post("")
-def scan_qr(request: schemas.ScanRequest, db: Session = Depends(database.get_db)):
+async def scan_qr(request: schemas.ScanRequest, http: Request):
+    started = perf_counter()
+    kiosk_id = kiosk_of(http)
+    # Runs on the single writer thread, committed together with other queued scans
+    try:
+        result = await writer.run(
+            process_scan, request, scan_time(request.scanned_at),
+            on_commit=lambda db, result: publish_results(db, [(request.event_id, result)]),
+        )
+    except HTTPException as e:
+        audit.log.record(
+            request.event_id, request.roll_no, normalize_roll_no(request.roll_no or ""), audit.error_outcome(e),
+            e.status_code, (perf_counter() - started) * 1000, kiosk_id, "scan", str(e.detail), request.scanned_at,
+        )
+        raise
+    audit.log.record_result(request, result, (perf_counter() - started) * 1000, kiosk_id)
+    return result
+
+@router.post("/batch", response_model=List[schemas.ScanResponse])
+async def scan_batch(batch: schemas.BatchScanRequest, http: Request):
+    """Apply buffered kiosk reads in one transaction; results keep request order."""
+    if len(batch.scans) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BATCH_SIZE} scans)")
+
+    return await apply_scans(
+        batch.scans, [scan_time(item.scanned_at) for item in batch.scans], kiosk_of(http), "batch"
+    )
+
+def kiosk_of(http: Request) -> str:
+    return http.headers.get("x-kiosk-id") or (http.client.host if http.client else "unknown")
+
+@router.get("/audit", response_model=schemas.ScanAuditPage)
+def scan_audit(
+    event_id: int,
+    cursor: int = 0,
+    limit: int = 100,
+    outcome: Optional[str] = None,
+    kiosk_id: Optional[str] = None,
+    db: Session = Depends(database.get_read_db),
+):
+    """Page through an event's scan attempts, oldest first (keyset on id).
+
+    Records reach the table within one audit flush interval of the scan.
+    """
+    limit = max(1, min(limit, 1000))
+    query = db.query(models.ScanAuditLog).filter(
+        models.ScanAuditLog.event_id == event_id,
+        models.ScanAuditLog.id > cursor,
+    )
+    if outcome:
+        query = query.filter(models.ScanAuditLog.outcome == outcome.upper())
+    if kiosk_id:
+        query = query.filter(models.ScanAuditLog.kiosk_id == kiosk_id)
+    items = query.order_by(models.ScanAuditLog.id).limit(limit).all()
+    next_cursor = items[-1].id if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/audit/stats")
+def scan_audit_stats():
+    return audit.log.stats()
+
+@router.get("/writer")
+def writer_stats():
+    return writer.stats()
+
+@router.get("/frame")
+def frame_decoder_stats():
+    return decoder.stats()
+
+@router.post("/frame")
+async def scan_frame(request: Request, event_id: Optional[int] = None):
+    """Decode uploaded camera frames server-side and scan every code found.
+
+    Accepts one raw image/jpeg or image/png body (?event_id=) or a
+    multipart form with event_id and one or more "frames" files.
+    """
+    # Concurrency is limited per peer address: X-Kiosk-Id is client-supplied
+    # and only labels the audit records. The slot is taken before the upload
+    # is read; the pool-wide frame cap still bounds clients sharing one
+    # address (e.g. behind a proxy).
+    peer = request.client.host if request.client else "unknown"
+    try:
+        with decoder.admit(peer) as reserve:
+            event_id, frames = await read_frames(request, event_id)
+            received_at = datetime.now()
+            reserve(len(frames))
+            try:
+                decoded = await decoder.decode([data for _, data in frames])
+            except Exception as e:
+                print(f"❌ Frame decode failed: {e}")
+                raise HTTPException(status_code=503, detail="Frame decoder unavailable")
+    except FrameLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+    # One scan per distinct code across the uploaded frames
+    roll_nos = list(dict.fromkeys(code["data"] for result in decoded for code in result["codes"] if code["data"]))
+    scans = []
+    if roll_nos:
+        items = [schemas.ScanRequest(roll_no=roll_no, event_id=event_id) for roll_no in roll_nos]
+        scans = await apply_scans(items, [received_at] * len(items), kiosk_of(request), "frame")
+
+    return {
+        "event_id": event_id,
+        "frames": [{"filename": name, **result} for (name, _), result in zip(frames, decoded)],
+        "scans": scans,
+    }
+
+async def read_frames(request: Request, event_id: Optional[int]) -> Tuple[int, list]:
+    """(event_id, [(filename, image bytes)]) from a raw image or multipart upload."""
+    frames = []
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        body = await read_body_limited(request, MAX_FRAMES_PER_REQUEST * MAX_FRAME_BYTES + MULTIPART_OVERHEAD_BYTES)
+        form = await Request(request.scope, replay_body(body)).form(max_files=MAX_FRAMES_PER_REQUEST)
+        if event_id is None and form.get("event_id"):
+            try:
+                event_id = int(form.get("event_id"))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="event_id must be an integer")
+        for upload in form.getlist("frames") + form.getlist("frame"):
+            frames.append((upload.filename, await upload.read()))
+    elif content_type.startswith(("image/jpeg", "image/png")):
+        frames.append((None, await read_body_limited(request, MAX_FRAME_BYTES)))
+    else:
+        raise HTTPException(status_code=415, detail="Send image/jpeg, image/png or multipart/form-data")
+
+    if event_id is None:
+        raise HTTPException(status_code=400, detail="event_id is required")
+    if not frames:
+        raise HTTPException(status_code=400, detail="No frames uploaded")
+    if len(frames) > MAX_FRAMES_PER_REQUEST:
+        raise HTTPException(status_code=413, detail=f"Too many frames (max {MAX_FRAMES_PER_REQUEST})")
+    if any(len(data) > MAX_FRAME_BYTES for _, data in frames):
+        raise frame_too_large()
+    return event_id, frames
+
+def frame_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Frame too large (max {MAX_FRAME_BYTES // (1024 * 1024)} MB)")
+
+async def read_body_limited(request: Request, limit: int) -> bytes:
+    """Request body, refused with 413 as soon as it is known to exceed limit bytes."""
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > limit:
+        raise frame_too_large()
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise frame_too_large()
+    return bytes(body)
+
+def replay_body(body: bytes):
+    """ASGI receive() that hands an already read body to a new Request (for .form())."""
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    return receive
+
+async def apply_scans(items: List[schemas.ScanRequest], times: List[datetime],
+                      kiosk_id: Optional[str] = None, source: str = "batch") -> list:
+    """Run several scans as one writer job; errors become per-item ERROR results."""
+    started = perf_counter()
+    order = capture_order(times)
+    results = await writer.run(
+        process_scans, items, times,
+        on_commit=lambda db, results: publish_results(db, [(items[i].event_id, results[i]) for i in order]),
+    )
+    latency_ms = (perf_counter() - started) * 1000
+    for i in order:
+        audit.log.record_result(items[i], results[i], latency_ms, kiosk_id, source)
+    return results
+
+def capture_order(times: List[datetime]) -> List[int]:
+    # Replay in capture order so check-in always precedes check-out
+    return sorted(range(len(times)), key=lambda i: times[i])
+
+def process_scans(db: Session, items: List[schemas.ScanRequest], times: List[datetime]) -> list:
+    """Apply several scans in capture order; flushes but does not commit."""
+    results = [None] * len(items)
+    for i in capture_order(times):
+        item = items[i]
+        try:
+            results[i] = process_scan(db, item, times[i])
+        except HTTPException as e:
+            results[i] = {
+                "action": "ERROR",
+                "roll_no": normalize_roll_no(item.roll_no or ""),
+                "student_name": "",
+                "message": e.detail,
+                "error_code": e.status_code
+            }
+    return results
+
+def publish_results(db: Session, results):
+    """Push committed CHECK_IN/CHECK_OUT deltas, then fresh counters once per event."""
+    changed = set()
+    for event_id, result in results:
+        live.publish_scan(event_id, result)
+        if result["action"] in ("CHECK_IN", "CHECK_OUT"):
+            changed.add(event_id)
+    # In write-behind mode the counters move when the journal flushes; it publishes them
+    if journal.active is None:
+        for event_id in changed:
+            live.publish_stats(db, event_id)
+
+def process_scan(db: Session, request: schemas.ScanRequest, now: datetime) -> dict:
+    """CHECK_IN / CHECK_OUT state machine for one scan; flushes but does not commit."""
     # 1. Input Validation
     if not request.roll_no or not request.event_id:
         raise HTTPException(status_code=400, detail="roll_no and event_id are required")
+    if now < datetime.now() - MAX_SCAN_AGE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"scanned_at is more than {MAX_SCAN_AGE.total_seconds() / 3600:g} h old; check the kiosk clock"
+        )
     
     # Vishwakarma V1 Mode: Strict String Ingestion (No transformations)
-    clean_roll_no = request.roll_no.strip().upper() 
+    clean_roll_no = normalize_roll_no(request.roll_no)
     
-    # 2. Check Event
-    event = db.query(models.Event).filter(models.Event.id == request.event_id).first()
+    # 2. Check Event (cached: active flag, duration, min percent)
+    event = roster_cache.get_event(db, request.event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     if not event.is_active:
         raise HTTPException(status_code=400, detail="Event is no longer active")
 
-    # 3. Check Student
-    from sqlalchemy import func
-    student = db.query(models.Student).filter(func.lower(models.Student.roll_no) == clean_roll_no.lower()).first()
+    # 3. Check Student (cached roster, case-insensitive)
+    student = roster_cache.get_student(db, clean_roll_no)
     if not student:
-        print(f"❌ Scan attempt failed: Student {clean_roll_no} not found")
         raise HTTPException(status_code=404, detail=f"No student registered with roll number: {clean_roll_no}")
 
-    # 4. Check Existing Log
-    log = db.query(models.AttendanceLog).filter(
-        models.AttendanceLog.roll_no == clean_roll_no,
-        models.AttendanceLog.event_id == request.event_id
-    ).first()
+    # Write-behind mode: decide in memory, journal, commit later
+    if journal.active is not None:
+        return journal.active.scan(db, event, student, clean_roll_no, now)
 
-    now = datetime.now()
-    now_iso = now.isoformat()
-
-    if not log:
-        # === FIRST SCAN -> CHECK-IN ===
-        new_log = models.AttendanceLog(
-            roll_no=clean_roll_no,
-            event_id=request.event_id,
-            check_in_time=now_iso,
-            status="PENDING"
-        )
-        db.add(new_log)
-        db.commit()
-        db.refresh(new_log)
-        
-        return {
-            "action": "CHECK_IN",
-            "roll_no": clean_roll_no,
-            "student_name": student.name,
-            "check_in_time": now_iso,
-            "message": f"✅ {student.name} checked in successfully"
-        }
-    
-    else:
-        # Check for rapid re-scan (Anti-Abuse)
-        last_action_time = datetime.fromisoformat(log.check_out_time if log.check_out_time else log.check_in_time)
-        time_diff = (now - last_action_time).total_seconds()
-        
-        if time_diff < 10: # 10 seconds cooldown
-             print(f"Updates blocked: {time_diff}s since last scan")
-             return {
-                "action": "DUPLICATE_BLOCKED",
-                "roll_no": clean_roll_no,
-                "student_name": student.name,
-                "status": log.status,
-                "message": f"⏳ Please wait 10s before rescanning."
-             }
-
-        # === SECOND SCAN -> CHECK-OUT ===
-        if log.check_out_time:
-             # Already checked out - Update logic? 
-             # For now, we allow updating checkout time ONLY if status is PENDING or ABSENT (re-evaluating)
-             # But if PRESENT, we block.
-             if log.status == "PRESENT":
-                 return {
-                    "action": "DUPLICATE_BLOCKED",
-                    "roll_no": clean_roll_no,
-                    "student_name": student.name,
-                    "check_in_time": log.check_in_time,
-                    "check_out_time": log.check_out_time,
-                    "status": log.status,
-                    "message": f"✅ {student.name} is already marked PRESENT."
-                 }
-        
-        # Perform Check-out Calculation
-        check_in_dt = datetime.fromisoformat(log.check_in_time)
-        duration_minutes = (now - check_in_dt).total_seconds() / 60.0
-        
-        required_minutes = event.duration_minutes * (event.min_attendance_percent / 100.0)
-        attendance_status = "PRESENT" if duration_minutes >= required_minutes else "ABSENT"
-        
-        # Prevent accidental rapid checkout (e.g. < 1 min)
-        if duration_minutes < 1.0:
-             return {
-                "action": "EARLY_CHECKOUT_WARNING",
-                "roll_no": clean_roll_no,
-                "student_name": student.name,
-                "message": f"⚠️ Too early to checkout! ({duration_minutes:.1f} min)"
-             }
-
-        log.check_out_time = now_iso
-        log.duration_minutes = duration_minutes
-        log.status = attendance_status
-        
-        db.commit()
-        db.refresh(log)
-        
-        msg = f"✅ {student.name} — PRESENT ({duration_minutes:.1f} min)" if attendance_status == "PRESENT" else \
-              f"❌ {student.name} — ABSENT ({duration_minutes:.1f} min < {required_minutes:.1f} min required)"
-
-        return {
-            "action": "CHECK_OUT",
-            "roll_no": clean_roll_no,
-            "student_name": student.name,
-            "check_in_time": log.check_in_time,
-            "check_out_time": now_iso,
-            "duration_minutes": duration_minutes,
-            "status": attendance_status,
-            "message": msg
-        }
+    # 4. Check-in / check-out in one statement
+    return upsert_scan(db, event, student, clean_roll_no, now)
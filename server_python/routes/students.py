@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy import func, or_, text
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Optional
+import io
+import re
 from .. import models, schemas, database
+from ..cache import CachedStudent, roster_cache, normalize_roll_no
+from ..student_import import import_students, iter_csv_rows
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.StudentCreate)
 def create_student(student: schemas.StudentCreate, db: Session = Depends(database.get_db)):
-    clean_roll_no = student.roll_no.strip().upper()
+    clean_roll_no = normalize_roll_no(student.roll_no)
     existing = db.query(models.Student).filter(models.Student.roll_no == clean_roll_no).first()
     if existing:
         raise HTTPException(status_code=409, detail=f"Student with roll number {clean_roll_no} already exists")
@@ -21,8 +26,96 @@ def create_student(student: schemas.StudentCreate, db: Session = Depends(databas
     db.add(new_student)
     db.commit()
     db.refresh(new_student)
+    roster_cache.add_student(CachedStudent(new_student.id, new_student.roll_no, new_student.name))
     return new_student
 
-@router.get("/", response_model=List[schemas.StudentCreate])
-def list_students(db: Session = Depends(database.get_db)):
-    return db.query(models.Student).all()
+@router.post("/bulk")
+def bulk_import_students(payload: Any = Body(...), db: Session = Depends(database.get_db)):
+    """JSON import: {"students": [...]} (as sent by Students.jsx) or a bare array."""
+    rows = payload.get("students") if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of students or {\"students\": [...]}")
+
+    added = []
+    result = import_students(db, (
+        (i, row if isinstance(row, dict) else {}) for i, row in enumerate(rows, start=1)
+    ), added)
+    db.commit()
+    roster_cache.add_students(added)
+    return result
+
+@router.post("/bulk/csv")
+def bulk_import_students_csv(file: UploadFile = File(...), db: Session = Depends(database.get_db)):
+    """CSV upload (multipart), parsed line by line from the spooled upload."""
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    added = []
+    try:
+        result = import_students(db, iter_csv_rows(stream), added)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    finally:
+        stream.detach()
+    db.commit()
+    roster_cache.add_students(added)
+    return result
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SEARCH_PAGE_SQL = text("""
+    SELECT s.id, s.roll_no, s.name, s.department, s.year
+    FROM students_fts JOIN students s ON s.id = students_fts.rowid
+    WHERE students_fts MATCH :match AND students_fts.rowid > :cursor
+    ORDER BY students_fts.rowid
+    LIMIT :limit
+""")
+SEARCH_COUNT_SQL = text("SELECT count(*) FROM students_fts WHERE students_fts MATCH :match")
+
+_search_index = None
+
+def has_search_index(db: Session) -> bool:
+    global _search_index
+    if _search_index is None:
+        _search_index = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'students_fts'")
+        ).first() is not None
+    return _search_index
+
+def fts_match(search: str) -> Optional[str]:
+    # Every word must match as a prefix: "hu22 cse" -> "hu22"* "cse"*
+    terms = re.findall(r"\w+", search)
+    return " ".join(f'"{term}"*' for term in terms) or None
+
+@router.get("/", response_model=schemas.StudentPage)
+def list_students(
+    search: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_read_db)
+):
+    """Keyset-paginated student list, ordered by id, optionally filtered by search."""
+    after = cursor or 0
+    match = fts_match(search) if search else None
+
+    if match and has_search_index(db):
+        params = {"match": match, "cursor": after, "limit": limit + 1}
+        rows = [dict(r._mapping) for r in db.execute(SEARCH_PAGE_SQL, params)]
+        total = db.execute(SEARCH_COUNT_SQL, {"match": match}).scalar()
+    else:
+        query = db.query(models.Student)
+        if search:
+            pattern = f"%{search.strip()}%"
+            query = query.filter(or_(
+                models.Student.roll_no.ilike(pattern),
+                models.Student.name.ilike(pattern),
+                models.Student.department.ilike(pattern)
+            ))
+        total = query.with_entities(func.count(models.Student.id)).scalar()
+        rows = query.filter(models.Student.id > after).order_by(models.Student.id).limit(limit + 1).all()
+
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = last["id"] if isinstance(last, dict) else last.id
+    return {"items": items, "next_cursor": next_cursor, "total": total}
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+from .cache import CachedEvent, CachedStudent
+
+COOLDOWN_SECONDS = 10
+MIN_CHECKOUT_MINUTES = 1.0
+
+_EPOCH = datetime(2000, 1, 1)
+
+
+def to_ms(ts: datetime) -> int:
+    """Whole milliseconds since an epoch, rounded the way SQLite's julianday() reads fractional seconds."""
+    return (ts.replace(microsecond=0) - _EPOCH) // timedelta(seconds=1) * 1000 + (ts.microsecond + 500) // 1000
+
+
+def elapsed_ms(start: datetime, end: datetime) -> int:
+    """end - start in whole milliseconds; attendance_store.elapsed_ms is the SQL twin.
+
+    Durations are compared against required_minutes, so the SQL and the
+    in-memory (write-behind) paths must produce the very same float.
+    """
+    return to_ms(end) - to_ms(start)
+
+
+class LogState(NamedTuple):
+    """The attendance_logs columns the scan state machine reads and writes."""
+    check_in_time: str
+    check_out_time: Optional[str]
+    duration_minutes: Optional[float]
+    status: str
+    open_since: Optional[str] = None
+
+
+def decide_scan(log, event: CachedEvent, student: CachedStudent, roll_no: str, now: datetime) -> Tuple[dict, Optional[LogState]]:
+    """Pure CHECK_IN / CHECK_OUT decision over in/out intervals.
+
+    `log` is anything with LogState's attributes (an AttendanceLog row or a
+    LogState) or None. A scan while inside (open_since set) closes the
+    interval and adds it to the running total in duration_minutes; a scan
+    while outside opens a new one. Returns the scan response and the new log
+    state, or None when nothing should be written.
+    """
+    now_iso = now.isoformat()
+
+    if log is None:
+        # === FIRST SCAN -> CHECK-IN ===
+        state = LogState(check_in_time=now_iso, check_out_time=None, duration_minutes=None, status="PENDING", open_since=now_iso)
+        return check_in_response(student, roll_no, state), state
+
+    # Check for rapid re-scan (Anti-Abuse)
+    last_action_time = datetime.fromisoformat(log.open_since or log.check_out_time or log.check_in_time)
+    time_diff = elapsed_ms(last_action_time, now) / 1000.0
+
+    if time_diff < COOLDOWN_SECONDS:
+        return {
+            "action": "DUPLICATE_BLOCKED",
+            "roll_no": roll_no,
+            "student_name": student.name,
+            "status": log.status,
+            "message": f"⏳ Please wait {COOLDOWN_SECONDS}s before rescanning."
+        }, None
+
+    if log.open_since is None:
+        # === RE-ENTRY -> CHECK-IN === (PRESENT is never taken back; the total only grows)
+        status = "PRESENT" if log.status == "PRESENT" else "PENDING"
+        state = LogState(log.check_in_time, log.check_out_time, log.duration_minutes, status, now_iso)
+        return check_in_response(student, roll_no, state), state
+
+    # === SCAN WHILE INSIDE -> CHECK-OUT ===
+    interval_minutes = elapsed_ms(datetime.fromisoformat(log.open_since), now) / 60000.0
+
+    # Prevent accidental rapid checkout (e.g. < 1 min)
+    if interval_minutes < MIN_CHECKOUT_MINUTES:
+        return {
+            "action": "EARLY_CHECKOUT_WARNING",
+            "roll_no": roll_no,
+            "student_name": student.name,
+            "message": f"⚠️ Too early to checkout! ({interval_minutes:.1f} min)"
+        }, None
+
+    duration_minutes = (log.duration_minutes or 0.0) + interval_minutes
+    attendance_status = "PRESENT" if duration_minutes >= event.required_minutes else "ABSENT"
+    state = LogState(log.check_in_time, now_iso, duration_minutes, attendance_status, None)
+    return check_out_response(event, student, roll_no, state), state
+
+
+def check_in_response(student: CachedStudent, roll_no: str, state: LogState) -> dict:
+    if state.check_out_time is None:
+        msg = f"✅ {student.name} checked in successfully"
+    else:
+        msg = f"✅ {student.name} checked in again ({state.duration_minutes or 0.0:.1f} min so far)"
+    return {
+        "action": "CHECK_IN",
+        "roll_no": roll_no,
+        "student_name": student.name,
+        "check_in_time": state.check_in_time,
+        "check_out_time": state.check_out_time,
+        "duration_minutes": state.duration_minutes,
+        "status": state.status,
+        "open_since": state.open_since,
+        "message": msg
+    }
+
+
+def check_out_response(event: CachedEvent, student: CachedStudent, roll_no: str, state: LogState) -> dict:
+    duration_minutes = state.duration_minutes
+    msg = f"✅ {student.name} — PRESENT ({duration_minutes:.1f} min)" if state.status == "PRESENT" else \
+          f"❌ {student.name} — ABSENT ({duration_minutes:.1f} min < {event.required_minutes:.1f} min required)"
+
+    return {
+        "action": "CHECK_OUT",
+        "roll_no": roll_no,
+        "student_name": student.name,
+        "check_in_time": state.check_in_time,
+        "check_out_time": state.check_out_time,
+        "duration_minutes": duration_minutes,
+        "status": state.status,
+        "open_since": None,
+        "message": msg
+    }
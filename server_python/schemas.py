@@ -5,6 +5,10 @@ from datetime import datetime
 class ScanRequest(BaseModel):
     roll_no: str
     event_id: int
+    scanned_at: Optional[datetime] = None # Client-side capture time (ISO)
+
+class BatchScanRequest(BaseModel):
+    scans: List[ScanRequest]
 
 class ScanResponse(BaseModel):
     action: str
@@ -15,6 +19,16 @@ class ScanResponse(BaseModel):
     check_out_time: Optional[str] = None
     duration_minutes: Optional[float] = None
     status: Optional[str] = None
+    open_since: Optional[str] = None # Set while the student is inside (current interval start)
+    error_code: Optional[int] = None # HTTP status a single scan would have returned
+
+class AttendanceIntervalResponse(BaseModel):
+    started_at: str
+    ended_at: Optional[str] = None
+    duration_minutes: Optional[float] = None
+
+    class Config:
+        from_attributes = True
 
 class StudentCreate(BaseModel):
     roll_no: str
@@ -22,6 +36,17 @@ class StudentCreate(BaseModel):
     department: Optional[str] = None
     year: Optional[int] = None
 
+class StudentResponse(StudentCreate):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class StudentPage(BaseModel):
+    items: List[StudentResponse]
+    next_cursor: Optional[int] = None # Pass back as ?cursor= for the next page
+    total: int
+
 class EventCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -39,3 +64,24 @@ class EventResponse(EventCreate):
 
     class Config:
         from_attributes = True
+
+class ScanAuditEntry(BaseModel):
+    id: int
+    event_id: int
+    kiosk_id: Optional[str] = None
+    source: str
+    raw_payload: str
+    roll_no: str
+    outcome: str
+    status_code: int
+    detail: Optional[str] = None
+    scanned_at: Optional[str] = None
+    received_at: str
+    latency_ms: float
+
+    class Config:
+        from_attributes = True
+
+class ScanAuditPage(BaseModel):
+    items: List[ScanAuditEntry]
+    next_cursor: Optional[int] = None # Pass back as ?cursor= for the next page
@@ -0,0 +1,68 @@
+import os
+from typing import Tuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+
+# Storage profile. SQLite allows one writer at a time, so writes share a
+# single pooled connection (callers queue on the pool instead of spinning on
+# "database is locked"), while WAL lets a separate pool of read-only
+# connections serve dashboards without waiting for scan commits.
+DATABASE_URL = os.environ.get("ATTENDANCE_DATABASE_URL", "sqlite:///./attendance.db")
+READ_POOL_SIZE = int(os.environ.get("ATTENDANCE_READ_POOL_SIZE", "8"))
+WRITE_POOL_TIMEOUT = 30  # seconds a writer waits for the connection
+
+# NORMAL is crash-safe in WAL mode; a power cut can only lose the last commits
+SYNCHRONOUS = os.environ.get("ATTENDANCE_SQLITE_SYNCHRONOUS", "NORMAL")
+BUSY_TIMEOUT_MS = int(os.environ.get("ATTENDANCE_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+MMAP_SIZE_MB = int(os.environ.get("ATTENDANCE_SQLITE_MMAP_MB", "256"))
+CACHE_SIZE_MB = int(os.environ.get("ATTENDANCE_SQLITE_CACHE_MB", "64"))
+
+
+def sqlite_pragmas(read_only: bool = False) -> list:
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={MMAP_SIZE_MB * 1024 * 1024}",
+        f"PRAGMA cache_size={-CACHE_SIZE_MB * 1024}",  # negative = KiB
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def _apply_pragmas(engine: Engine, pragmas: list):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def create_engines(url: str = DATABASE_URL, tuned: bool = True) -> Tuple[Engine, Engine]:
+    """(write_engine, read_engine) for url.
+
+    tuned=False gives the previous setup - one default engine in rollback
+    journal mode for both roles - for comparison in benchmarks.storage.
+    In-memory and non-SQLite databases also get one shared engine.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        engine = create_engine(url)
+        return engine, engine
+
+    connect_args = {"check_same_thread": False}
+    if not tuned or parsed.database in (None, "", ":memory:"):
+        engine = create_engine(url, connect_args=connect_args)
+        return engine, engine
+
+    connect_args["timeout"] = BUSY_TIMEOUT_MS / 1000
+    write_engine = create_engine(
+        url, connect_args=connect_args, pool_size=1, max_overflow=0, pool_timeout=WRITE_POOL_TIMEOUT
+    )
+    _apply_pragmas(write_engine, sqlite_pragmas())
+    read_engine = create_engine(url, connect_args=connect_args, pool_size=READ_POOL_SIZE, max_overflow=0)
+    _apply_pragmas(read_engine, sqlite_pragmas(read_only=True))
+    return write_engine, read_engine
@@ -0,0 +1,117 @@
+import csv
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from . import models
+from .cache import CachedStudent, normalize_roll_no
+
+INSERT_CHUNK_ROWS = 5000
+MAX_REPORTED_ROWS = 1000   # skipped/error details returned; counts are always complete
+
+CSV_COLUMNS = ["roll_no", "name", "department", "year"]
+HEADER_ALIASES = {
+    "roll_no": "roll_no", "roll no": "roll_no", "rollno": "roll_no", "roll number": "roll_no",
+    "name": "name", "student name": "name", "full name": "name",
+    "department": "department", "dept": "department",
+    "year": "year",
+}
+
+STUDENT_INSERT = insert(models.Student).returning(models.Student.id, models.Student.roll_no, models.Student.name)
+
+
+def iter_csv_rows(stream: TextIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (row_number, row) from a CSV, one line at a time.
+
+    A header row is optional; without one the columns are positional
+    (RollNo, Name, Department, Year - the format Students.jsx accepts).
+    """
+    reader = csv.reader(stream)
+    columns = CSV_COLUMNS
+    for row_number, cells in enumerate(reader, start=1):
+        cells = [c.strip() for c in cells]
+        if not any(cells):
+            continue
+        if row_number == 1:
+            header = [HEADER_ALIASES.get(c.lower()) for c in cells]
+            if "roll_no" in header:
+                columns = header
+                continue
+        yield row_number, {col: value for col, value in zip(columns, cells) if col}
+
+
+def _clean_row(row: Dict[str, Any]) -> Tuple[Optional[dict], Optional[str]]:
+    roll_no = str(row.get("roll_no") or "").strip()
+    name = str(row.get("name") or "").strip()
+    if not roll_no:
+        return None, "roll_no is required"
+    if not name:
+        return None, "name is required"
+
+    year = row.get("year")
+    if year in (None, ""):
+        year = None
+    else:
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            return None, f"invalid year: {year}"
+
+    department = str(row.get("department") or "").strip() or None
+    return {"roll_no": normalize_roll_no(roll_no), "name": name, "department": department, "year": year}, None
+
+
+def import_students(db: Session, rows: Iterable[Tuple[int, Dict[str, Any]]],
+                    added: Optional[List[CachedStudent]] = None) -> dict:
+    """Insert new students in large executemany chunks inside one transaction.
+
+    Roll numbers are normalized like create_student. Rows already in the
+    database or repeated within the upload are skipped; invalid rows are
+    reported with their row number. Inserted students are appended to
+    `added` for the roster cache. The caller commits.
+    """
+    def flush(chunk: List[dict]) -> int:
+        result = db.execute(STUDENT_INSERT, chunk)
+        if added is not None:
+            added.extend(CachedStudent(r.id, r.roll_no, r.name) for r in result)
+        return len(chunk)
+
+    existing = {normalize_roll_no(r) for (r,) in db.query(models.Student.roll_no)}
+    seen = set()
+    chunk: List[dict] = []
+    inserted = skipped = failed = 0
+    skipped_rows: List[dict] = []
+    errors: List[dict] = []
+
+    for row_number, row in rows:
+        student, error = _clean_row(row)
+        if error:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ROWS:
+                errors.append({"row": row_number, "roll_no": row.get("roll_no"), "error": error})
+            continue
+
+        roll_no = student["roll_no"]
+        if roll_no in existing or roll_no in seen:
+            skipped += 1
+            if len(skipped_rows) < MAX_REPORTED_ROWS:
+                reason = "already registered" if roll_no in existing else "duplicate in upload"
+                skipped_rows.append({"row": row_number, "roll_no": roll_no, "reason": reason})
+            continue
+
+        seen.add(roll_no)
+        chunk.append(student)
+        if len(chunk) >= INSERT_CHUNK_ROWS:
+            inserted += flush(chunk)
+            chunk = []
+
+    if chunk:
+        inserted += flush(chunk)
+
+    return {
+        "message": f"Imported {inserted} students ({skipped} skipped, {failed} errors)",
+        "inserted": inserted,
+        "skipped": skipped,
+        "errors": failed,
+        "skipped_rows": skipped_rows,
+        "error_rows": errors,
+    }
@@ -1,194 +1,492 @@
 import cv2
-import requests
 import time
 import argparse
+import os
 import numpy as np
-import zxingcpp
 import threading
-import queue
-
-try:
-    from pyzbar.pyzbar import decode as pyzbar_decode
-    PYZBAR_AVAILABLE = True
-except ImportError:
-    PYZBAR_AVAILABLE = False
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import NamedTuple
+from scan_submitter import ScanSubmitter, default_kiosk_id
+from scan_roster import LocalRoster
+from qr_decode import DecodeCascade, VISHWAKARMA_CASCADE
 
 # Vishwakarma V1 CONFIGURATION
 API_URL = "http://localhost:8000/api/scan"
 EVENT_ID = 1
 
+ROI_MARGIN = 0.5        # tracked region = code bounding box + 50% on each side
+ROI_MIN_PAD = 24        # pixels
+ROI_MAX_MISSES = 5      # decodes without a code before the region is dropped
+
+class Frame(NamedTuple):
+    """A captured frame living in a ring slot; release() it when done."""
+    image: np.ndarray
+    seq: int            # capture sequence number (gaps = frames never consumed)
+    captured: float     # time.monotonic() when the frame was grabbed
+    wall: float         # time.time() at the same moment (scan timestamps)
+    slot: int
+
+class FrameRing:
+    """Small ring of preallocated frame buffers between one capture thread and its consumer.
+
+    The capture thread fills a free slot in place and publishes it as the
+    latest frame; an unread latest frame that gets replaced counts as
+    dropped. Slots the consumer holds (e.g. while a decode runs) are never
+    overwritten.
+    """
+    def __init__(self, first, slots=4):
+        self.buffers = [np.empty_like(first) for _ in range(slots)]
+        self.meta = [None] * slots
+        self.cond = threading.Condition()
+        self.latest = None
+        self.held = set()
+        self.dropped = 0
+        self.closed = False
+
+    def free_slot(self):
+        with self.cond:
+            for slot in range(len(self.buffers)):
+                if slot != self.latest and slot not in self.held:
+                    return slot
+        return None
+
+    def publish(self, slot, seq, captured, wall):
+        with self.cond:
+            if self.latest is not None:
+                self.dropped += 1
+            self.meta[slot] = (seq, captured, wall)
+            self.latest = slot
+            self.cond.notify()
+
+    def take(self, timeout=None):
+        """Newest unread frame, waiting up to timeout seconds (None = don't wait)."""
+        with self.cond:
+            if self.latest is None and timeout and not self.closed:
+                self.cond.wait(timeout)
+            if self.latest is None:
+                return None
+            slot, self.latest = self.latest, None
+            self.held.add(slot)
+            seq, captured, wall = self.meta[slot]
+            return Frame(self.buffers[slot], seq, captured, wall, slot)
+
+    def release(self, frame):
+        with self.cond:
+            self.held.discard(frame.slot)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
 class VideoStream:
-    """Threaded video stream for high-performance capture."""
-    def __init__(self, src=0):
+    """Threaded video capture into a preallocated frame ring (no per-frame allocation)."""
+    def __init__(self, src=0, name=None, slots=4):
+        self.src = src
+        self.name = name or str(src)
         self.stream = cv2.VideoCapture(src)
         # Set high resolution
         self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
         self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        (self.grabbed, self.frame) = self.stream.read()
-        self.stopped = False
-        self.queue = queue.Queue(maxsize=1)
+        # Video files are paced at their native fps instead of decoded as fast as possible
+        self.frame_interval = 0.0
+        if isinstance(src, str) and os.path.isfile(src):
+            fps = self.stream.get(cv2.CAP_PROP_FPS)
+            self.frame_interval = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+        (self.grabbed, first) = self.stream.read()
+        self.stopped = not self.grabbed
+        self.ring = FrameRing(first if self.grabbed else np.zeros((720, 1280, 3), np.uint8), slots)
+        self.mirror = False
+        self.frames = 0
 
     def start(self):
-        t = threading.Thread(target=self.update, args=())
+        t = threading.Thread(target=self.update, args=(), name=f"capture-{self.name}")
         t.daemon = True
         t.start()
         return self
 
     def update(self):
-        while True:
-            if self.stopped:
+        while not self.stopped:
+            slot = self.ring.free_slot()
+            if slot is None:
+                # Consumer holds every slot: let it catch up
+                time.sleep(0.001)
+                continue
+            read_start = time.monotonic()
+            if not self.stream.grab():
+                self.stop()
                 return
-            (grabbed, frame) = self.stream.read()
+            captured, wall = time.monotonic(), time.time()
+            buf = self.ring.buffers[slot]
+            grabbed, image = self.stream.retrieve(buf)
             if not grabbed:
                 self.stop()
                 return
-            
-            if not self.queue.full():
-                self.queue.put(frame)
-            else:
-                 # Drop older frames for real-time processing
-                try:
-                    self.queue.get_nowait()
-                    self.queue.put(frame)
-                except queue.Empty:
-                    pass
-
-    def read(self):
-        return self.queue.get()
+            if image is not buf:
+                # Resolution changed: the new array becomes this slot's buffer
+                self.ring.buffers[slot] = image
+            if self.mirror:
+                cv2.flip(image, 1, dst=image)
+            self.frames += 1
+            self.ring.publish(slot, self.frames, captured, wall)
+            if self.frame_interval:
+                time.sleep(max(0.0, self.frame_interval - (time.monotonic() - read_start)))
+
+    def read(self, block=True):
+        """Latest frame (a Frame to release()), or None: with block=True waits up to 1 s."""
+        return self.ring.take(timeout=1.0 if block else None)
+
+    def release(self, frame):
+        self.ring.release(frame)
+
+    @property
+    def dropped(self):
+        return self.ring.dropped
 
     def stop(self):
         self.stopped = True
+        self.ring.close()
         self.stream.release()
 
-def preprocess_frame(frame):
-    """Vishwakarma V1 Preprocessing Pipeline."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
-    # Contrast Limited Adaptive Histogram Equalization (CLAHE)
-    # Better than simple thresholding for uneven lighting
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    enhanced = clahe.apply(gray)
-    
-    return enhanced
+# Shared by every decode worker so the adaptive ordering learns from all cameras
+CASCADE = DecodeCascade.from_spec(VISHWAKARMA_CASCADE)
 
-def vishwakarma_v1_decode(frame, enhanced_frame):
-    """Hybrid Decoding Stack: ZXing-CPP -> PyZbar -> OpenCV"""
-    results = []
-    
-    # 1. Primary Engine: ZXing-CPP (Fastest, C++)
-    try:
-        # zxing-cpp takes numpy array directly
-        barcodes = zxingcpp.read_barcodes(frame)
-        for barcode in barcodes:
-            # Extract points safely
-            points = []
-            if hasattr(barcode, 'position'):
-                pos = barcode.position
-                # zxing-cpp position points usually allow access like strict fields or iteration
-                # We'll try to convert to list of tuples if possible, or just default to empty
-                try:
-                    points = [
-                        (pos.top_left.x, pos.top_left.y),
-                        (pos.top_right.x, pos.top_right.y),
-                        (pos.bottom_right.x, pos.bottom_right.y),
-                        (pos.bottom_left.x, pos.bottom_left.y)
-                    ]
-                except:
-                    pass
-            
-            results.append({
-                "data": barcode.text,
-                "type": "ZXing",
-                "points": points
-            })
-    except Exception:
-        pass
-
-    if results: return results
-
-    # 2. Fallback Engine: PyZbar (Robust standard)
-    if PYZBAR_AVAILABLE:
-        try:
-            # Try on enhanced frame
-            barcodes = pyzbar_decode(enhanced_frame)
-            for barcode in barcodes:
-                results.append({
-                    "data": barcode.data.decode("utf-8"),
-                    "type": "PyZbar",
-                    "points": barcode.polygon
-                })
-        except Exception:
-            pass
-        
-    return results
+def vishwakarma_v1_decode(frame, roi=None, cascade=None):
+    """Hybrid Decoding Stack: tracked ROI, then the cascade (default ZXing low-res -> ZXing -> CLAHE + PyZbar).
+
+    Stages stop at the first hit and are reordered by observed cost per
+    success; the CLAHE image is only built if its stage runs.
+    """
+    return (cascade or CASCADE).decode(frame, roi=roi)
+
+def track_roi(results, frame_shape, margin=ROI_MARGIN):
+    """Bounding box around the detected codes, expanded by a margin and clipped to the frame."""
+    points = [pt for res in results for pt in res["points"]]
+    if not points:
+        return None
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    pad = int(max(max(xs) - min(xs), max(ys) - min(ys)) * margin) + ROI_MIN_PAD
+    height, width = frame_shape[:2]
+    x0, y0 = max(min(xs) - pad, 0), max(min(ys) - pad, 0)
+    x1, y1 = min(max(xs) + pad, width), min(max(ys) + pad, height)
+    if x1 - x0 < 16 or y1 - y0 < 16:
+        return None
+    return x0, y0, x1, y1
+
+def decode_job(frame, roi=None):
+    """Runs on a decode worker: staged decode (enhancing only if needed), with monotonic start/end."""
+    started = time.monotonic()
+    outcome = vishwakarma_v1_decode(frame, roi=roi)
+    enhanced = outcome.images.get("clahe")
+    return (enhanced[0] if enhanced else None), outcome.results, started, time.monotonic()
+
+class CameraStats:
+    """Rolling capture fps, decode fps, decode latency and capture-to-submit latency for one source."""
+    def __init__(self, stream):
+        self.stream = stream
+        self.decodes = 0
+        self.latencies = deque(maxlen=120)
+        self.scan_latencies = deque(maxlen=120)
+        self.window_start = time.time()
+        self.window_frames = 0
+        self.window_decodes = 0
+        self.capture_fps = 0.0
+        self.decode_fps = 0.0
+
+    def record(self, latency):
+        self.decodes += 1
+        self.latencies.append(latency)
+
+    def record_scan(self, total):
+        self.scan_latencies.append(total)
+
+    def tick(self):
+        elapsed = time.time() - self.window_start
+        if elapsed < 1.0:
+            return False
+        self.capture_fps = (self.stream.frames - self.window_frames) / elapsed
+        self.decode_fps = (self.decodes - self.window_decodes) / elapsed
+        self.window_start = time.time()
+        self.window_frames = self.stream.frames
+        self.window_decodes = self.decodes
+        return True
+
+    def latency_ms(self, pct=50, samples=None):
+        samples = self.latencies if samples is None else samples
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+
+    def summary(self):
+        scans = f" | scan p50 {self.latency_ms(50, self.scan_latencies):5.1f} ms" if self.scan_latencies else ""
+        return (f"cap {self.capture_fps:4.1f} fps | dec {self.decode_fps:4.1f} fps | "
+                f"p50 {self.latency_ms(50):5.1f} ms p95 {self.latency_ms(95):5.1f} ms | "
+                f"dropped {self.stream.dropped}{scans}")
+
+class MotionGate:
+    """Cheap change detector in front of the decode stack.
+
+    Each frame is shrunk to a 64x36 grey thumbnail and compared with the
+    previous one; motion is the percentage of thumbnail pixels whose
+    brightness changed by more than PIXEL_DELTA. Frames are decoded while the
+    scene changes, for a short settle time afterwards (a card held still after
+    a blurry approach) and while a code is being tracked; static frames are
+    skipped. After idle_after seconds without change the lane goes idle and
+    only samples idle_fps frames per second until motion returns.
+    """
+    PIXEL_DELTA = 20
+
+    def __init__(self, threshold=1.0, settle=1.5, idle_after=10.0, idle_fps=2.0, enabled=True):
+        self.threshold = threshold
+        self.settle = settle
+        self.idle_after = idle_after
+        self.idle_interval = 1.0 / idle_fps
+        self.enabled = enabled
+        self.previous = None
+        self.last_motion = time.time()
+        self.last_sample = 0.0
+        self.idle = False
+        self.sampled = False
+        self.counts = {"decoded": 0, "skipped": 0, "idle": 0}
+
+    def check(self, frame, tracking=False):
+        """Return "decode", "skip" (static scene) or "idle" (low-rate mode, not sampled)."""
+        now = time.time()
+        self.sampled = False
+        if not self.enabled:
+            return self._count("decode")
+        if self.idle and now - self.last_sample < self.idle_interval:
+            return self._count("idle")
+        self.last_sample = now
+        self.sampled = True
+
+        thumb = cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA)
+        if thumb.ndim == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        if self.previous is None:
+            change = 100.0
+        else:
+            change = float((cv2.absdiff(thumb, self.previous) > self.PIXEL_DELTA).mean() * 100)
+        self.previous = thumb
+
+        if change > self.threshold or tracking:
+            self.last_motion = now
+            self.idle = False
+        quiet_for = now - self.last_motion
+        if quiet_for < self.settle:
+            return self._count("decode")
+        if quiet_for > self.idle_after:
+            self.idle = True
+            return self._count("idle")
+        return self._count("skip")
+
+    def _count(self, verdict):
+        self.counts[{"decode": "decoded", "skip": "skipped"}.get(verdict, "idle")] += 1
+        return verdict
+
+    def summary(self):
+        return (f"{'IDLE' if self.idle else 'live'} | decoded {self.counts['decoded']} "
+                f"skipped {self.counts['skipped']} idle {self.counts['idle']}")
+
+class CameraLane:
+    """Per-source state: stream, in-flight decode, tracked region and last overlay."""
+    def __init__(self, stream, gate):
+        self.stream = stream
+        self.stats = CameraStats(stream)
+        self.gate = gate
+        self.pending = None
+        self.frame = None       # Frame held from the ring while its decode runs
+        self.decode_span = None # (started, finished) monotonic
+        self.enhanced = None
+        self.results = []
+        self.roi = None
+        self.roi_misses = 0
+        self.flash = False
+
+def submit_scan(submitter, roster, lane, data, engine, event_id):
+    frame = lane.frame
+    captured_at = datetime.fromtimestamp(frame.wall)
+    # Per-code dedup and local roster/state checks: only state-changing scans leave the kiosk
+    verdict = roster.check(data, now=captured_at)
+    if verdict == "duplicate":
+        return
+    if verdict != "send":
+        print(f"🚫 [{lane.stream.name}] {data}: {verdict.replace('_', ' ')} (not sent)")
+        return
+
+    # Queued for the background submitter; the frame loop never waits on the API
+    submitter.submit(data, event_id, captured_at=captured_at)
+    submitted = time.monotonic()
+    started, finished = lane.decode_span
+    lane.stats.record_scan(submitted - frame.captured)
+    lane.flash = True
+    print(f"🔍 [{lane.stream.name}] Scanned [{engine}]: {data} | frame #{frame.seq} "
+          f"capture→decode {(started - frame.captured) * 1000:.1f} ms, decode {(finished - started) * 1000:.1f} ms, "
+          f"→submit {(submitted - finished) * 1000:.1f} ms")
+
+def format_cascade_stats(stats):
+    stages = ", ".join(
+        f"{name} {s['hits']}/{s['attempts']} {s['mean_ms']:.1f}ms" for name, s in stats["stages"].items()
+    )
+    skipped = f" | skipping {', '.join(stats['skipped'])}" if stats["skipped"] else ""
+    return f"order {' > '.join(stats['order'])} | {stages}{skipped}"
+
+def show_lane(lane, frame):
+    lane.stats.tick()
+    cv2.putText(frame, lane.stats.summary(), (10, frame.shape[0] - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+    cv2.putText(frame, lane.gate.summary(), (10, frame.shape[0] - 35), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+    cv2.imshow(f"Vishwakarma V1 Scanner [{lane.stream.name}]", frame)
+
+def report_results(submitter, roster):
+    for scan, status_code, body in submitter.results():
+        roster.record(scan["roll_no"], status_code, body)
+        if status_code in [200, 201]:
+            print(f"✅ Success [{scan['roll_no']}]: {body.get('message')}")
+        else:
+            print(f"❌ Error {status_code} [{scan['roll_no']}]: {body.get('detail') or body.get('message')}")
 
 def main():
     parser = argparse.ArgumentParser(description="Vishwakarma V1 QR Scanner")
-    parser.add_argument("--camera", type=int, default=0, help="Camera ID")
+    parser.add_argument("--camera", type=int, nargs="+", default=None, help="Camera ID(s), e.g. --camera 0 1 2 3")
+    parser.add_argument("--source", action="append", default=[], help="Video file or stream URL (repeatable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Shared decode worker threads")
     parser.add_argument("--event", type=int, default=1, help="Event ID")
     parser.add_argument("--mirror", action="store_true", help="Start mirrored")
+    parser.add_argument("--api", type=str, default=API_URL, help="Scan API endpoint")
+    parser.add_argument("--cascade", type=str, default=VISHWAKARMA_CASCADE, help="Decode stages, e.g. zxing:lowres>zxing>pyzbar:clahe")
+    parser.add_argument("--static-order", action="store_true", help="Keep the cascade order instead of adapting it")
+    parser.add_argument("--motion-threshold", type=float, default=1.0, help="Percent of changed pixels that counts as motion")
+    parser.add_argument("--idle-after", type=float, default=10.0, help="Seconds without motion before a camera goes idle")
+    parser.add_argument("--no-gate", action="store_true", help="Decode every frame (disable motion gating)")
+    parser.add_argument("--dedup-ttl", type=float, default=3.0, help="Seconds to ignore a code after it was seen")
+    parser.add_argument("--spool", type=str, default="scan_spool.jsonl", help="Offline spool file for unsent scans")
+    parser.add_argument("--kiosk", type=str, default=None, help="Kiosk ID for the server's audit log (default: hostname:cameras)")
     args = parser.parse_args()
 
+    sources = list(args.camera or []) + args.source
+    if not sources:
+        sources = [0]
+
     print(f"🚀 Launching Vishwakarma V1 Scanner...")
-    print(f"🔹 Primary Engine: ZXing-CPP")
-    print(f"🔹 Fallback Engine: PyZbar")
-    print(f"🔹 Preprocessing: CLAHE")
+    global CASCADE
+    CASCADE = DecodeCascade.from_spec(args.cascade, adaptive=not args.static_order)
+    print(f"🔹 Decode cascade: ROI tracking -> {' -> '.join(CASCADE.order())} ({'fixed' if args.static_order else 'adaptive'} order)")
+    print(f"🔹 Sources: {', '.join(str(s) for s in sources)} | Decode workers: {args.workers}")
     
-    vs = VideoStream(src=args.camera).start()
+    lanes = [
+        CameraLane(
+            VideoStream(src=src, name=f"cam{i}:{src}").start(),
+            MotionGate(threshold=args.motion_threshold, idle_after=args.idle_after, enabled=not args.no_gate),
+        )
+        for i, src in enumerate(sources)
+    ]
     time.sleep(1.0) # Warmup
 
+    # OpenCV and ZXing release the GIL, so one thread pool spreads decoding over all cores
+    pool = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="decode")
+    # One submitter (and spool) per process, so all its cameras share one kiosk ID
+    kiosk_id = args.kiosk or default_kiosk_id(*sources)
+    submitter = ScanSubmitter(args.api, kiosk_id=kiosk_id, spool_path=args.spool).start()
+    roster = LocalRoster(args.api, args.event, dedup_ttl=args.dedup_ttl).start()
     mirror_mode = args.mirror
-    last_scan_time = 0
-    cooldown = 3.0
-    last_data = ""
-
-    while True:
-        frame = vs.read()
-        if frame is None: break
-
-        if mirror_mode:
-            frame = cv2.flip(frame, 1)
-
-        # Pipeline
-        enhanced = preprocess_frame(frame)
-        results = vishwakarma_v1_decode(frame, enhanced)
-
-        for res in results:
-            data = res['data'].strip()
-            
-            # Draw (Basic bounding box for now)
-            # Visual feedback is critical
-            cv2.putText(frame, f"{data} ({res['type']})", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-            
-            # Logic
-            current_time = time.time()
-            if (current_time - last_scan_time > cooldown) or (data != last_data):
-                print(f"🔍 Scanned [{res['type']}]: {data}")
-                
-                try:
-                    payload = {"roll_no": data, "event_id": args.event}
-                    response = requests.post(f"{API_URL}/", json=payload, timeout=2)
-                    if response.status_code in [200, 201]:
-                        print(f"✅ Success: {response.json().get('message')}")
-                    else:
-                        print(f"❌ Error {response.status_code}: {response.json().get('detail', response.text)}")
-                except Exception as e:
-                    print(f"⚠️ API Error: {e}")
-
-                last_scan_time = current_time
-                last_data = data
+    for lane in lanes:
+        # Mirroring happens in place in the capture thread
+        lane.stream.mirror = mirror_mode
+    show_cv_view = len(lanes) == 1
+    last_report = time.time()
+
+    while lanes:
+        for lane in list(lanes):
+            # Feed the pool: one in-flight decode per camera, always on the newest frame
+            if lane.pending is None:
+                frame = lane.stream.read(block=False)
+                if frame is None:
+                    if lane.stream.stopped:
+                        print(f"📴 [{lane.stream.name}] Source ended")
+                        lanes.remove(lane)
+                    continue
+                verdict = lane.gate.check(frame.image, tracking=lane.roi is not None)
+                if verdict != "decode":
+                    # Static scene: keep the preview live without decoding
+                    if verdict == "skip" or lane.gate.sampled:
+                        show_lane(lane, frame.image)
+                    lane.stream.release(frame)
+                    continue
+                lane.frame = frame
+                lane.pending = pool.submit(decode_job, frame.image, lane.roi)
+                continue
+
+            if not lane.pending.done():
+                continue
+
+            lane.enhanced, lane.results, started, finished = lane.pending.result()
+            lane.pending = None
+            lane.decode_span = (started, finished)
+            lane.stats.record(finished - started)
+            frame = lane.frame.image
+
+            # Track the code region so the next frames only decode around it
+            if lane.results:
+                lane.roi = track_roi(lane.results, frame.shape)
+                lane.roi_misses = 0
+            elif lane.roi is not None:
+                lane.roi_misses += 1
+                if lane.roi_misses >= ROI_MAX_MISSES:
+                    lane.roi = None
+            if lane.roi is not None:
+                x0, y0, x1, y1 = lane.roi
+                cv2.rectangle(frame, (x0, y0), (x1, y1), (255, 255, 0), 1)
+
+            for res in lane.results:
+                data = res['data'].strip()
                 
+                # Draw (Basic bounding box for now)
+                # Visual feedback is critical
+                cv2.putText(frame, f"{data} ({res['type']}/{res['stage']})", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                submit_scan(submitter, roster, lane, data, res['type'], args.event)
+
+            if lane.flash:
                 # Visual Flash
                 cv2.rectangle(frame, (0,0), (frame.shape[1], frame.shape[0]), (0,255,0), 10)
+                lane.flash = False
+
+            show_lane(lane, frame)
+            if show_cv_view and lane.enhanced is not None:
+                # Only built when the PyZbar fallback ran
+                cv2.imshow("Computer Vision View (CLAHE)", lane.enhanced)
+            # Hand the ring slot back to the capture thread
+            lane.stream.release(lane.frame)
+            lane.frame = None
+
+        report_results(submitter, roster)
 
-        cv2.imshow("Vishwakarma V1 Scanner", frame)
-        cv2.imshow("Computer Vision View (CLAHE)", enhanced)
+        if time.time() - last_report > 5.0:
+            for lane in lanes:
+                print(f"📊 [{lane.stream.name}] {lane.stats.summary()} | {lane.gate.summary()}")
+            print(f"📋 Codes: {roster.summary()}")
+            print(f"🧩 Decode: {format_cascade_stats(CASCADE.stats())}")
+            if submitter.offline:
+                print(f"📴 Offline: {submitter.stats}")
+            last_report = time.time()
 
-        key = cv2.waitKey(1) & 0xFF
+        # Idle cameras need no tight polling loop
+        key = cv2.waitKey(1 if any(not lane.gate.idle for lane in lanes) else 50) & 0xFF
         if key == ord('q'): break
-        if key == ord('m'): mirror_mode = not mirror_mode
+        if key == ord('m'):
+            mirror_mode = not mirror_mode
+            for lane in lanes:
+                lane.stream.mirror = mirror_mode
 
-    vs.stop()
+    for lane in lanes:
+        lane.stream.stop()
+    pool.shutdown(wait=False)
+    submitter.stop()
+    report_results(submitter, roster)
+    roster.stop()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":